@@ -1,10 +1,69 @@
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import connection
+from django.utils.functional import cached_property
+
 from .models import Organization, Skill, Volunteer, VolunteerEvent, Certificate, LogEntry
 
-admin.site.register(Organization)
-admin.site.register(Skill)
-admin.site.register(Volunteer)
-admin.site.register(VolunteerEvent)
-admin.site.register(Certificate)
-admin.site.register(LogEntry)
 
+class EstimateCountPaginator(Paginator):
+    """
+    Paginator that reads the planner's row estimate on PostgreSQL instead of
+    running COUNT(*) over the whole table. Falls back to a real count elsewhere
+    or when the queryset is filtered.
+    """
+
+    @cached_property
+    def count(self):
+        qs = self.object_list
+        if connection.vendor == "postgresql" and not qs.query.where:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT reltuples::bigint FROM pg_class WHERE relname = %s",
+                    [qs.model._meta.db_table],
+                )
+                row = cursor.fetchone()
+            if row and row[0] >= 0:
+                return row[0]
+        return super().count
+
+
+@admin.register(Organization)
+class OrganizationAdmin(admin.ModelAdmin):
+    list_display = ("name", "member_ds", "is_dsga", "connector_endpoint")
+    list_filter = ("member_ds", "is_dsga")
+
+
+@admin.register(Skill)
+class SkillAdmin(admin.ModelAdmin):
+    list_display = ("label", "esco_uri")
+    search_fields = ("label",)
+
+
+@admin.register(Volunteer)
+class VolunteerAdmin(admin.ModelAdmin):
+    list_display = ("name", "organization", "is_manager")
+    list_select_related = ("organization",)
+    list_filter = ("is_manager",)
+
+
+@admin.register(VolunteerEvent)
+class VolunteerEventAdmin(admin.ModelAdmin):
+    list_display = ("name", "organization", "duration_hours", "isShared", "isFinished")
+    list_select_related = ("organization",)
+    list_filter = ("isShared", "isFinished")
+
+
+@admin.register(Certificate)
+class CertificateAdmin(admin.ModelAdmin):
+    list_display = ("id", "volunteer", "issuer", "issued_at")
+    list_select_related = ("volunteer", "issuer")
+
+
+@admin.register(LogEntry)
+class LogEntryAdmin(admin.ModelAdmin):
+    list_display = ("timestamp", "level", "action")
+    list_filter = ("level",)
+    list_per_page = 50
+    show_full_result_count = False
+    paginator = EstimateCountPaginator
@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class VmsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'vms'
+
+    def ready(self):
+        from django.conf import settings
+
+        if getattr(settings, "VMS_LOG_ASYNC", False):
+            from vms.services import log_queue
+            log_queue.install_shutdown_hooks()
@@ -1,10 +1,8 @@
-from .models import Volunteer
+from django.utils.functional import SimpleLazyObject
+
+from .services.decorators import session_volunteer
+
 
 def current_volunteer(request):
-    volunteer = None
-    if request.session.get("volunteer_id"):
-        try:
-            volunteer = Volunteer.objects.get(id=request.session["volunteer_id"])
-        except Volunteer.DoesNotExist:
-            volunteer = None
-    return {"volunteer": volunteer}
+    # Lazy: no query at all unless the template actually touches {{ volunteer }}
+    return {"volunteer": SimpleLazyObject(lambda: session_volunteer(request))}
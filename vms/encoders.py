@@ -0,0 +1,39 @@
+# vms/encoders.py
+import json
+
+import orjson
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+
+
+_django_default = DjangoJSONEncoder().default
+
+
+def dumps(o, option=0):
+    """
+    Serialize to JSON bytes with orjson.
+    Types orjson does not know (Decimal, lazy strings, ...) fall back to DjangoJSONEncoder.default.
+    """
+    return orjson.dumps(o, default=_django_default, option=orjson.OPT_NON_STR_KEYS | option)
+
+
+class ORJSONEncoder(DjangoJSONEncoder):
+    """JSONField encoder that serializes with orjson (see dumps)."""
+
+    def encode(self, o):
+        return dumps(o).decode()
+
+
+class ORJSONDecoder(json.JSONDecoder):
+    """JSONField decoder that parses with orjson."""
+
+    def decode(self, s, *args, **kwargs):
+        return orjson.loads(s)
+
+
+class ORJSONResponse(HttpResponse):
+    """JsonResponse counterpart serialized with orjson (datetimes are encoded natively)."""
+
+    def __init__(self, data, option=0, **kwargs):
+        kwargs.setdefault("content_type", "application/json")
+        super().__init__(content=dumps(data, option), **kwargs)
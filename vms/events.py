@@ -1,34 +1,79 @@
-def annotate_event(event, volunteer, registered_ids):
+from collections import defaultdict
+
+from .models import Skill, Volunteer, VolunteerEvent
+
+
+def load_skill_context(events, volunteer):
     """
-    Annotates an event with:
-    - Registration status
-    - Skill status (has/missing)
-    - Eligibility to register
+    Bulk-loads everything annotate_event needs for a list of events:
+    - volunteer_skill_ids: set of the volunteer's skill ids
+    - event_skill_rows: {event_id: set(skill_id)}
+    - skill_labels: {skill_id: label}
+    At most three queries regardless of the number of events; none when the
+    volunteer's and the events' skills were prefetched.
     """
-    # Mark if already registered
-    event.is_registered = event.id in registered_ids
+    # Served from the prefetch cache when loaded via Volunteer.objects.for_profile(),
+    # otherwise plain ids from the m2m table (no Skill instances built)
+    prefetched = getattr(volunteer, "_prefetched_objects_cache", {}).get("skills")
+    if prefetched is not None:
+        volunteer_skill_ids = {s.id for s in prefetched}
+    else:
+        volunteer_skill_ids = set(
+            Volunteer.skills.through.objects.filter(volunteer_id=volunteer.id)
+            .values_list("skill_id", flat=True)
+        )
 
-    # Skill eligibility
-    event_skills = list(event.skills.all())
-    volunteer_skills = set(volunteer.skills.all())
-    skill_status = {}
-    missing_skills = []
+    event_skill_rows = defaultdict(set)
+    prefetched = [getattr(e, "_prefetched_objects_cache", {}).get("skills") for e in events]
+    if events and all(p is not None for p in prefetched):
+        # Events came from VolunteerEvent.objects.with_counts(): skills are already loaded
+        skill_labels = {}
+        for e, skills in zip(events, prefetched):
+            for s in skills:
+                event_skill_rows[e.id].add(s.id)
+                skill_labels[s.id] = s.label
+        return volunteer_skill_ids, event_skill_rows, skill_labels
 
-    for s in event_skills:
-        if s in volunteer_skills:
-            skill_status[s.label] = "has"
-        else:
-            skill_status[s.label] = "missing"
-            missing_skills.append(s.label)
+    rows = VolunteerEvent.skills.through.objects.filter(
+        volunteerevent_id__in=[e.id for e in events]
+    ).values_list("volunteerevent_id", "skill_id")
+    for event_id, skill_id in rows:
+        event_skill_rows[event_id].add(skill_id)
 
-    event.skill_status = skill_status
-    event.missing_skills = missing_skills
-    event.can_register = len(missing_skills) == 0
-    event.is_federated = (volunteer.organization and event.organization != volunteer.organization)
+    skill_ids = set().union(*event_skill_rows.values())
+    skill_labels = dict(Skill.objects.filter(id__in=skill_ids).values_list("id", "label"))
 
-    return event
+    return volunteer_skill_ids, event_skill_rows, skill_labels
 
 
+def annotate_events(events, volunteer):
+    """
+    Annotates every event, in one pass, with:
+    - Skill status (has/missing)
+    - Eligibility to register
+    - Whether it belongs to another organization (is_federated)
+    Registration status (is_registered) is tagged in SQL by
+    VolunteerEvent.objects.with_registration(); skill data is bulk-loaded
+    once by load_skill_context (no queries per event).
+    """
+    volunteer_skill_ids, event_skill_rows, skill_labels = load_skill_context(events, volunteer)
+    home_org_id = volunteer.organization_id
+    no_skills = frozenset()
 
+    for event in events:
+        skill_status = {}
+        missing_skills = []
+        for skill_id in sorted(event_skill_rows.get(event.id, no_skills)):
+            label = skill_labels[skill_id]
+            if skill_id in volunteer_skill_ids:
+                skill_status[label] = "has"
+            else:
+                skill_status[label] = "missing"
+                missing_skills.append(label)
 
+        event.skill_status = skill_status
+        event.missing_skills = missing_skills
+        event.can_register = not missing_skills
+        event.is_federated = home_org_id is not None and event.organization_id != home_org_id
 
+    return events
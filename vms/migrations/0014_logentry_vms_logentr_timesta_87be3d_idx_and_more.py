@@ -0,0 +1,29 @@
+# Generated by Django 5.2.6 on 2026-10-14 17:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vms', '0013_alter_volunteer_available_hours_per_week'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='logentry',
+            index=models.Index(fields=['-timestamp', 'level'], name='vms_logentr_timesta_87be3d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='volunteer',
+            index=models.Index(fields=['name'], name='vms_volunte_name_e713f2_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='volunteerevent',
+            index=models.Index(fields=['organization', 'isFinished'], name='vms_volunte_organiz_ab2865_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='volunteerevent',
+            index=models.Index(fields=['-shared_since'], name='vms_volunte_shared__2cb3e6_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.6 on 2026-10-14 17:44
+
+import vms.encoders
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vms', '0014_logentry_vms_logentr_timesta_87be3d_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='certificate',
+            name='items',
+            field=models.JSONField(blank=True, decoder=vms.encoders.ORJSONDecoder, default=list, encoder=vms.encoders.ORJSONEncoder),
+        ),
+        migrations.AlterField(
+            model_name='organization',
+            name='metadata_json',
+            field=models.JSONField(blank=True, decoder=vms.encoders.ORJSONDecoder, default=dict, encoder=vms.encoders.ORJSONEncoder),
+        ),
+    ]
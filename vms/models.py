@@ -1,26 +1,88 @@
 # vms/models.py
 import os
-from itertools import cycle
+import threading
+from functools import lru_cache
 
 from django.conf import settings
+from django.core.cache import cache
 from django.db import models
+from django.db.models import Count, Exists, OuterRef, Prefetch, Q, Sum
+from django.db.models.signals import post_delete, post_save
 
-from django.core.serializers.json import DjangoJSONEncoder
 from django.utils import timezone
 
+import orjson
+
+from .encoders import ORJSONDecoder, ORJSONEncoder, dumps
+
 EVENT_IMAGES_PATH = os.path.join(settings.BASE_DIR, "vms", "static", "vms", "images", "events")
-_event_images = [
-    f for f in os.listdir(EVENT_IMAGES_PATH)
-    if f.lower().endswith((".jpg", ".jpeg", ".png"))
-]
-_image_cycle = cycle(_event_images)  # will loop endlessly
+
+_IMAGE_SUFFIXES = frozenset({".jpg", ".png", "jpeg"})  # last 4 chars of the file name
+
+def _is_image(name):
+    # Only lowercase the suffix, not the whole file name
+    tail = name[-4:].lower()
+    return tail in _IMAGE_SUFFIXES and (tail != "jpeg" or name[-5:-4] == ".")
+
+@lru_cache(maxsize=1)
+def _event_images():
+    # Listed once, on first use (not at import time)
+    try:
+        with os.scandir(EVENT_IMAGES_PATH) as entries:
+            return tuple(e.name for e in entries if _is_image(e.name) and e.is_file())
+    except FileNotFoundError:
+        return ()
+
+_image_index = 0
+_image_lock = threading.Lock()
+
+def _next_images(n):
+    """Reserve the next n images round-robin; safe across worker threads."""
+    global _image_index
+    images = _event_images()
+    if not images:
+        return [""] * n
+    with _image_lock:
+        start = _image_index
+        _image_index += n
+    return [images[(start + i) % len(images)] for i in range(n)]
+
+def _next_image():
+    return _next_images(1)[0]
 
 # --- Reusable small helpers -------------------------------------------------
+_ESCO_PREFIX = "http://data.europa.eu/esco/skill/"
+
 def make_esco_uri(esco_id_or_uuid):
     # Accept either full URI or ESCO id and normalize to a data.europa.eu URI
-    if str(esco_id_or_uuid).startswith("http"):
-        return str(esco_id_or_uuid)
-    return f"http://data.europa.eu/esco/skill/{esco_id_or_uuid}"
+    if isinstance(esco_id_or_uuid, str):  # common case: no str() round-trip
+        return esco_id_or_uuid if esco_id_or_uuid.startswith("http") else _ESCO_PREFIX + esco_id_or_uuid
+    esco_id_or_uuid = str(esco_id_or_uuid)
+    if esco_id_or_uuid.startswith("http"):
+        return esco_id_or_uuid
+    return _ESCO_PREFIX + esco_id_or_uuid
+
+
+# --- JSON-LD constants (shared, treat as read-only) --------------------------
+_VOL_CTX = {
+    "schema": "https://schema.org/",
+    "esco": "http://data.europa.eu/esco/",
+    "vms": "https://vms.example.org/context#"
+}
+_CERT_CTX = {
+    "schema": "https://schema.org/",
+    "vms": "https://vms.example.org/context#"
+}
+_ORG_ID = "https://vms.example.org/orgs/{}".format
+_EVENT_ID = "https://vms.example.org/events/{}".format
+_VOL_ID = "https://vms.example.org/volunteers/{}".format
+_CERT_ID = "https://vms.example.org/certs/{}".format
+_SKILL_ID = "https://vms.example.org/skills/{}".format
+
+
+DS_MEMBERS_CACHE_KEY = "ds_members"  # [(id, name)] of data space members, see services.dataspace
+ORGS_JSON_CACHE_KEY = "orgs_json"  # encoded api_orgs response body, see views_ui
+DSGA_ISSUER_CACHE_KEY = "dsga_issuer"  # certificate issuer (DSGA Organization or None), see views_ui
 
 # --- Domain models ---------------------------------------------------------
 class Organization(models.Model):
@@ -36,7 +98,7 @@ class Organization(models.Model):
     contact_email = models.EmailField(blank=True, default="")
     connector_endpoint = models.URLField(blank=True, default="")
     certificate_thumbprint = models.CharField(max_length=128, blank=True, default="")
-    metadata_json = models.JSONField(blank=True, default=dict, encoder=DjangoJSONEncoder)
+    metadata_json = models.JSONField(blank=True, default=dict, encoder=ORJSONEncoder, decoder=ORJSONDecoder)
 
     # --- add local vocabularies ---
     local_volunteer_schema = {
@@ -63,7 +125,7 @@ class Organization(models.Model):
     def to_jsonld(self):
         return {
             "@type": "Organization",
-            "@id": f"https://vms.example.org/orgs/{self.id}",
+            "@id": _ORG_ID(self.id),
             "name": self.name,
             "url": self.url,
             "email": self.contact_email,
@@ -71,10 +133,19 @@ class Organization(models.Model):
         }
 
     def catalog(self):
+        events = self.events.all()  # to_jsonld only needs organization_id, no join
+        # Read skill ids straight from the m2m table instead of a DISTINCT over joined Skill rows
+        skill_ids = (
+            VolunteerEvent.skills.through.objects
+            .filter(volunteerevent__organization_id=self.id)
+            .values_list("skill_id", flat=True)
+            .distinct()
+        )
+        skills = Skill.objects.in_bulk(list(skill_ids))
         return {
             "org": self.to_jsonld(),
-            "events": [e.to_jsonld() for e in self.events.all()],
-            "skills": [s.to_jsonld() for s in Skill.objects.filter(events__organization=self).distinct()]
+            "events": [e.to_jsonld() for e in events],
+            "skills": [skills[sid].to_jsonld() for sid in sorted(skills)]
         }
 
 
@@ -93,7 +164,7 @@ class Skill(models.Model):
         return self.label
 
     def uri(self):
-        return self.esco_uri or f"https://vms.example.org/skills/{self.id}"
+        return self.esco_uri or _SKILL_ID(self.id)
 
     def to_jsonld(self):
         if self.esco_uri:
@@ -101,6 +172,30 @@ class Skill(models.Model):
         return {"@id": self.uri(), "name": self.label, "description": self.description}
 
 
+class VolunteerQuerySet(models.QuerySet):
+    def for_profile(self):
+        """
+        Volunteer pages: organization joined in, skills prefetched with just the
+        columns those pages read. Registration comes per event from
+        VolunteerEvent.objects.with_registration().
+        """
+        return self.select_related("organization").prefetch_related(
+            Prefetch("skills", queryset=Skill.objects.only("id", "label", "esco_uri")),
+        )
+
+    # Skill filters use EXISTS (semi-join) instead of joining + distinct()
+    def with_any_skill(self, skill_ids):
+        return self.filter(Exists(Volunteer.skills.through.objects.filter(
+            volunteer_id=OuterRef("pk"), skill_id__in=skill_ids)))
+
+    def with_all_skills(self, skill_ids):
+        qs = self
+        for skill_id in set(skill_ids):
+            qs = qs.filter(Exists(Volunteer.skills.through.objects.filter(
+                volunteer_id=OuterRef("pk"), skill_id=skill_id)))
+        return qs
+
+
 class Volunteer(models.Model):
     """
     Core volunteer profile. This follows the thesis VolunteerRole/Volunteer suggestions:
@@ -128,15 +223,27 @@ class Volunteer(models.Model):
     skills = models.ManyToManyField(Skill, blank=True, related_name="volunteers")
     events = models.ManyToManyField("VolunteerEvent", blank=True, related_name="volunteers")
 
+    objects = VolunteerQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["name"]),  # login and switch_volunteer lookups
+        ]
+
     def total_hours(self):
-        return sum(e.duration_hours for e in self.events.all())
+        # Bulk callers can annotate the queryset with
+        # hours_total=Sum("events__duration_hours") to skip the per-row aggregate.
+        hours = getattr(self, "hours_total", None)
+        if hours is None:
+            hours = self.events.aggregate(t=Sum("duration_hours"))["t"]
+        return hours or 0
 
     def __str__(self):
         return f"{self.name} "
 
 
     def skills_list(self):
-        return [s.label for s in self.skills.all()]
+        return list(self.skills.values_list("label", flat=True))
 
     def to_jsonld(self):
         """
@@ -144,18 +251,11 @@ class Volunteer(models.Model):
         Uses schema:Person base, includes vms:totalHours and ESCO skills as @id links.
         See Listings 5.1/5.2 in thesis.}
         """
-        ctx = {
-            "@context": {
-                "schema": "https://schema.org/",
-                "esco": "http://data.europa.eu/esco/",
-                "vms": "https://vms.example.org/context#"
-            }
-        }
         skills_jsonld = [ {"@id": s.esco_uri or s.uri()} for s in self.skills.all() ]
         profile = {
-            **ctx,
+            "@context": _VOL_CTX,
             "@type": "vms:Volunteer",
-            "@id": f"https://vms.example.org/volunteers/{self.id}",
+            "@id": _VOL_ID(self.id),
             "schema:name": self.name,
             "schema:location": self.location,
             "schema:memberOf": self.organization,
@@ -171,6 +271,47 @@ class Volunteer(models.Model):
         return profile
 
 
+class VolunteerEventQuerySet(models.QuerySet):
+    def visible_to(self, org):
+        """
+        Events listed to members of `org`: its own events plus, for Data Space members,
+        events shared by the other member organizations. One WHERE clause, no queryset union.
+        """
+        if org is None:
+            return self.none()
+        q = Q(organization=org)
+        if org.member_ds:
+            q |= Q(isShared=True, organization__member_ds=True) & ~Q(organization=org)
+        return self.filter(q)
+
+    def with_counts(self):
+        """
+        Annotate num_registered, join the organization and prefetch skill labels, so
+        listing pages can read registered_volunteers / organization / skills_needed
+        without per-event queries.
+        """
+        return self.annotate(num_registered=Count("volunteers")).select_related("organization").prefetch_related(
+            Prefetch("skills", queryset=Skill.objects.only("id", "label"))
+        )
+
+    def with_registration(self, volunteer):
+        """Annotate is_registered for one volunteer (EXISTS on the m2m table, no join)."""
+        return self.annotate(is_registered=Exists(Volunteer.events.through.objects.filter(
+            volunteer_id=volunteer.pk, volunteerevent_id=OuterRef("pk"))))
+
+    def bulk_create_with_images(self, events, batch_size=500):
+        """
+        bulk_create() skips save(), so assign default images here in one pass
+        (a single lock acquisition) before the batched INSERT.
+        """
+        events = list(events)
+        images = iter(_next_images(sum(1 for e in events if not e.image)))
+        for e in events:
+            if not e.image:
+                e.image = next(images)
+        return self.bulk_create(events, batch_size=batch_size)
+
+
 class VolunteerEvent(models.Model):
     """
     An event (schema:Event / vms:VolunteerEvent). Events can host VolunteerTasks.
@@ -197,6 +338,14 @@ class VolunteerEvent(models.Model):
 
     image = models.CharField(max_length=250, blank=True)
 
+    objects = VolunteerEventQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["organization", "isFinished"]),
+            models.Index(fields=["-shared_since"]),
+        ]
+
     def __str__(self):
         return f"{self.name}"
 
@@ -210,18 +359,20 @@ class VolunteerEvent(models.Model):
     def to_jsonld(self):
         doc = {
             "@type": "vms:VolunteerEvent",
-            "@id": f"https://vms.example.org/events/{self.id}",
+            "@id": _EVENT_ID(self.id),
             "schema:name": self.name
         }
         if self.location:
             doc["schema:location"] = {"@type": "Place", "name": self.location}
-        if self.organization:
-            doc["schema:organizer"] = {"@id": f"https://vms.example.org/orgs/{self.organization.id}"}
+        if self.organization_id:
+            doc["schema:organizer"] = {"@id": _ORG_ID(self.organization_id)}
         return doc
 
     @property
     def registered_volunteers(self):
-        return self.volunteers.count()
+        # Set by VolunteerEvent.objects.with_counts()
+        num = getattr(self, "num_registered", None)
+        return self.volunteers.count() if num is None else num
 
     @property
     def skills_needed(self):
@@ -230,11 +381,8 @@ class VolunteerEvent(models.Model):
 
 
     def save(self, *args, **kwargs):
-        if not self.image:  # only assign if empty
-            try:
-                self.image = next(_image_cycle)
-            except StopIteration:
-                pass  # fallback: leave empty
+        if not self.image:  # only assign if empty (stays empty if there are no images)
+            self.image = _next_image()
         super().save(*args, **kwargs)
 
 
@@ -249,30 +397,43 @@ class Certificate(models.Model):
     volunteer = models.ForeignKey(Volunteer, on_delete=models.CASCADE)
     issued_at = models.DateTimeField(auto_now_add=True)
     issuer = models.ForeignKey(Organization, null=True, blank=True, on_delete=models.SET_NULL)
-    items = models.JSONField(blank=True, default=list, encoder=DjangoJSONEncoder)  # canonical items included in cert
+    items = models.JSONField(blank=True, default=list, encoder=ORJSONEncoder, decoder=ORJSONDecoder)  # canonical items included in cert
     proof_hash = models.CharField(max_length=128, blank=True, default="")  # mock or real proof
     skills = models.ManyToManyField(Skill, blank=True, related_name="certificates")
 
     def __str__(self):
         return f"Cert {self.id} for {self.volunteer.name}"
 
+    def items_fragment(self):
+        """`items` serialized once, as an orjson.Fragment that orjson.dumps copies verbatim."""
+        return orjson.Fragment(dumps(self.items))
+
+    @classmethod
+    def batch_to_jsonld(cls, certs=None):
+        """
+        Serialize many certificates with one query for their skills (and the
+        volunteer/issuer joined in) instead of one m2m query per certificate.
+        """
+        certs = cls.objects.all() if certs is None else certs
+        certs = certs.select_related("volunteer", "issuer").prefetch_related(
+            Prefetch("skills", queryset=Skill.objects.only("id", "label", "esco_uri"))
+        )
+        return [c.to_jsonld() for c in certs]
+
     # in models.py -> Certificate.to_jsonld (keep your existing, this is additive)
     def to_jsonld(self):
         doc = {
-            "@context": {
-                "schema": "https://schema.org/",
-                "vms": "https://vms.example.org/context#"
-            },
+            "@context": _CERT_CTX,
             "@type": "schema:EducationalOccupationalCredential",
-            "@id": f"https://vms.example.org/certs/{self.id}",
+            "@id": _CERT_ID(self.id),
             "schema:name": f"Volunteer Certificate {self.id}",
-            "vms:issuedTo": {"@id": f"https://vms.example.org/volunteers/{self.volunteer.id}"},
+            "vms:issuedTo": {"@id": _VOL_ID(self.volunteer_id)},
             "schema:dateIssued": self.issued_at.date().isoformat(),
             "vms:items": self.items,
             "vms:proofHash": self.proof_hash,
         }
         if self.issuer:
-            doc["schema:recognizedBy"] = {"@id": f"https://vms.example.org/orgs/{self.issuer.id}",
+            doc["schema:recognizedBy"] = {"@id": _ORG_ID(self.issuer_id),
                                           "schema:name": self.issuer.name}
         skills = [{"@id": s.esco_uri or s.uri(), "schema:name": s.label} for s in self.skills.all()]
         if skills:
@@ -299,6 +460,17 @@ class LogEntry(models.Model):
 
     class Meta:
         ordering = ["-timestamp"]
+        indexes = [
+            models.Index(fields=["-timestamp", "level"]),
+        ]
 
     def __str__(self):
-        return f"[{self.timestamp.isoformat()}] {self.level} {self.action}"
\ No newline at end of file
+        return f"[{self.timestamp.isoformat()}] {self.level} {self.action}"
+
+
+def _drop_org_caches(sender, **kwargs):
+    cache.delete_many([DS_MEMBERS_CACHE_KEY, ORGS_JSON_CACHE_KEY, DSGA_ISSUER_CACHE_KEY])
+
+
+post_save.connect(_drop_org_caches, sender=Organization)
+post_delete.connect(_drop_org_caches, sender=Organization)
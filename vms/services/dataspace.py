@@ -1,24 +1,50 @@
 # vms/services/dataspace.py
 import hashlib
-import json
+from functools import lru_cache
 
-from vms.services.logging import log_event
-from vms.models import Organization, VolunteerEvent, Skill
+from django.core.cache import cache
+
+from vms.services.logging import LazyJSON, build_log_entry, log_events
+from vms.models import DS_MEMBERS_CACHE_KEY, Organization, VolunteerEvent, Skill
+
+DS_MEMBERS_TTL = 60  # seconds; also dropped whenever an Organization is saved/deleted
 
 EDC_NS = "https://w3id.org/edc/v0.0.1/ns/"
 ODRL_CTX = "http://www.w3.org/ns/odrl.jsonld"
 
+# Shared JSON-LD / policy building blocks (treat as read-only)
+_EVENT_CONTEXT = {
+    "schema": "https://schema.org/",
+    "vms": "https://vms.example.org/context",
+    "esco": "https://data.europa.eu/esco/skill",
+}
+_BASE_CONSTRAINTS = (
+    {"leftOperand": "purpose", "operator": "eq", "rightOperand": "volunteer_matching"},
+    {"leftOperand": "retention", "operator": "lte", "rightOperand": "P6M"},
+)
+_POLICY_DUTIES = (
+    {"action": "deleteAfter",
+     "constraint": {"leftOperand": "state", "operator": "eq", "rightOperand": "event_finished"}},
+)
+
+@lru_cache(maxsize=4096)
 def _short_id(s: str, n=12):
-    return hashlib.sha1(s.encode()).hexdigest()[:n]
+    # Non-cryptographic use (stable ids only); BLAKE2b sized to the hex length we keep
+    return hashlib.blake2b(s.encode(), digest_size=(n + 1) // 2).hexdigest()[:n]
+
+_ISO_DURATIONS = {h: f"PT{h}H" for h in range(1, 25)}
 
 def _iso_duration(hours: int) -> str:
     try:
-        h = int(hours) if int(hours) > 0 else 1
+        h = int(hours)
     except Exception:
         h = 1
-    return f"PT{h}H"
+    if h < 1:
+        h = 1
+    return _ISO_DURATIONS.get(h) or f"PT{h}H"
 
 def _event_skills_jsonld(event: VolunteerEvent):
+    # event.skills.all() is served from the prefetch cache when callers prefetch "skills"
     skills = []
     for s in event.skills.all():
         if s.esco_uri:
@@ -66,82 +92,89 @@ _SHARED_EVENT_MAPPING = {
     "prioritize_local": "vms:priorityPolicy",
 }
 
+# Shared fields sampled by map_local_event_to_shared, in output order
+_SAMPLED_FIELDS = ("title", "description", "location", "duration_hours", "skills_list", "org_membership")
+
+def _flatten_mapping(src):
+    """(local_field, shared_key) pairs for one org, resolved once at import time."""
+    pairs = []
+    for field in _SAMPLED_FIELDS:
+        local_key = src.get(field, field)
+        shared_key = _SHARED_EVENT_MAPPING.get(
+            src.get(local_key, local_key),
+            _SHARED_EVENT_MAPPING.get(local_key, "(no mapping)")
+        )
+        pairs.append((local_key, shared_key))
+    return tuple(pairs)
+
+_FLAT_MAPPINGS = {org_name: _flatten_mapping(src) for org_name, src in _EVENT_LOCAL_MAPPINGS.items()}
+
 def build_event_jsonld(org: Organization, event: VolunteerEvent, endpoint: str, asset_id: str, contract_id: str):
+    # Optional fields are only added when non-empty (same key order as before, no filter pass)
     doc = {
-        "@context": {
-            "schema": "https://schema.org/",
-            "vms": "https://vms.example.org/context",
-            "esco": "https://data.europa.eu/esco/skill",
-        },
+        "@context": _EVENT_CONTEXT,
         "@type": "schema:Event",
         "@id": f"https://vms.example.org/events/{event.id}",
-        "schema:name": event.name,
-        "schema:description": event.description or "",
-        "schema:location": {"@type": "schema:Place", "schema:name": event.location} if event.location else None,
-        "schema:duration": _iso_duration(event.duration_hours),
-        "schema:organizer": {
-            "@type": "schema:Organization",
-            "@id": f"https://vms.example.org/orgs/{org.id}",
-            "schema:name": org.name,
-        },
-        "schema:skills": _event_skills_jsonld(event),
-        "vms:isShared": bool(event.isShared),
-        "vms:priorityPolicy": "local-first" if event.prioritize_local else "open"
     }
-    return {k: v for k, v in doc.items() if v not in (None, [], "", {})}
+    if event.name:
+        doc["schema:name"] = event.name
+    if event.description:
+        doc["schema:description"] = event.description
+    if event.location:
+        doc["schema:location"] = {"@type": "schema:Place", "schema:name": event.location}
+    doc["schema:duration"] = _iso_duration(event.duration_hours)
+    doc["schema:organizer"] = {
+        "@type": "schema:Organization",
+        "@id": f"https://vms.example.org/orgs/{org.id}",
+        "schema:name": org.name,
+    }
+    skills = _event_skills_jsonld(event)
+    if skills:
+        doc["schema:skills"] = skills
+    doc["vms:isShared"] = bool(event.isShared)
+    doc["vms:priorityPolicy"] = "local-first" if event.prioritize_local else "open"
+    return doc
 
 def map_local_event_to_shared(org: Organization, event: VolunteerEvent):
-    src = _EVENT_LOCAL_MAPPINGS.get(org.name, _EVENT_LOCAL_MAPPINGS["_default"])
-    sample_local = {
-        src.get("title", "title"): event.name,
-        src.get("description", "description"): event.description,
-        src.get("location", "location"): event.location,
-        src.get("duration_hours", "duration_hours"): event.duration_hours,
-        src.get("skills_list", "skills_list"): [s.label for s in event.skills.all()],
-        src.get("org_membership", "org_membership"): org.name,
-    }
-    mapping = []
-    for local_key, value in sample_local.items():
-        shared_key = _SHARED_EVENT_MAPPING.get(
-            src.get(local_key, local_key),
-            _SHARED_EVENT_MAPPING.get(local_key, "(no mapping)")
-        )
-        mapping.append({
-            "local_field": local_key,
-            "mapped_to": shared_key,
-            "sample_value": value,
-        })
-    return mapping
-
-def build_usage_policy(org: Organization, event: VolunteerEvent):
-    policy_id = _short_id(f"policy-{org.id}-{event.id}")
-    constraints = [
-        {"leftOperand": "purpose", "operator": "eq", "rightOperand": "volunteer_matching"},
-        {"leftOperand": "retention", "operator": "lte", "rightOperand": "P6M"},
+    flat = _FLAT_MAPPINGS.get(org.name, _FLAT_MAPPINGS["_default"])
+    values = (
+        event.name,
+        event.description,
+        event.location,
+        event.duration_hours,
+        [s.label for s in event.skills.all()],
+        org.name,
+    )
+    return [
+        {"local_field": local_key, "mapped_to": shared_key, "sample_value": value}
+        for (local_key, shared_key), value in zip(flat, values)
     ]
+
+def build_usage_policy(org: Organization, event: VolunteerEvent, asset_id: str = None):
+    policy_id = _short_id(f"policy-{org.id}-{event.id}")
+    if asset_id is None:
+        asset_id = _short_id(f"asset-{org.id}-{event.id}")
+    constraints = _BASE_CONSTRAINTS
     if event.prioritize_local:
-        constraints.append({"leftOperand": "audience", "operator": "eq", "rightOperand": f"org:{org.id}"})
-    duties = [
-        {"action": "deleteAfter",
-         "constraint": {"leftOperand": "state", "operator": "eq", "rightOperand": "event_finished"}}
-    ]
+        constraints += ({"leftOperand": "audience", "operator": "eq", "rightOperand": f"org:{org.id}"},)
     return {
         "@context": ODRL_CTX,
         "@type": "Set",
         "@id": f"urn:policy:{policy_id}",
         "permission": [{
-            "target": f"urn:edc:asset:{_short_id(f'asset-{org.id}-{event.id}')}",
+            "target": f"urn:edc:asset:{asset_id}",
             "action": [{"type": "use"}, {"type": "read"}, {"type": "access"}],
-            "constraint": constraints
+            "constraint": list(constraints)
         }],
-        "duty": duties
+        "duty": list(_POLICY_DUTIES)
     }
 
 def _pretty(data):
-    return json.dumps(data, indent=2, ensure_ascii=False)
+    return LazyJSON(data)
 
 # ---- Asset + Contract registration ----
-def edc_register_asset_and_offer(org: Organization, event: VolunteerEvent):
+def edc_register_asset_and_offer(org: Organization, event: VolunteerEvent, entries: list):
+    """Log entries are appended to `entries`; the caller writes them with log_events()."""
     base = (org.connector_endpoint or "").rstrip("/")
     endpoint = f"{base}/api/catalog/{org.id}/events/{event.id}/"
     asset_id = _short_id(f"asset-{org.id}-{event.id}")
@@ -163,10 +196,10 @@ def edc_register_asset_and_offer(org: Organization, event: VolunteerEvent):
             "vms:organizationId": str(org.id),
         }
     }
-    log_event("EDC.AssetRegistered", _pretty(asset))
+    entries.append(build_log_entry("EDC.AssetRegistered", _pretty(asset)))
 
-    policy = build_usage_policy(org, event)
-    log_event("Policy.UsageCreated", _pretty(policy))
+    policy = build_usage_policy(org, event, asset_id)
+    entries.append(build_log_entry("Policy.UsageCreated", _pretty(policy)))
 
     offer = {
         "@type": "edc:ContractOfferDescription",
@@ -174,7 +207,7 @@ def edc_register_asset_and_offer(org: Organization, event: VolunteerEvent):
         "edc:assetId": asset_id,
         "edc:policy": policy
     }
-    log_event("EDC.ContractOfferPublished", _pretty(offer))
+    entries.append(build_log_entry("EDC.ContractOfferPublished", _pretty(offer)))
 
     return {
         "endpoint": endpoint,
@@ -184,17 +217,26 @@ def edc_register_asset_and_offer(org: Organization, event: VolunteerEvent):
     }
 
 # ---- Federated Notifications ----
-def notify_trust_anchor_and_members(org: Organization, event: VolunteerEvent, endpoint: str):
-    log_event("DSGA.Notification", _pretty({
+def _ds_members():
+    members = cache.get(DS_MEMBERS_CACHE_KEY)
+    if members is None:
+        members = list(Organization.objects.filter(member_ds=True).values_list("id", "name"))
+        cache.set(DS_MEMBERS_CACHE_KEY, members, DS_MEMBERS_TTL)
+    return members
+
+def notify_trust_anchor_and_members(org: Organization, event: VolunteerEvent, endpoint: str, entries: list):
+    """Log entries are appended to `entries`; the caller writes them with log_events()."""
+    entries.append(build_log_entry("DSGA.Notification", _pretty({
         "subject": "New event asset published",
         "organization": org.name,
         "event": event.name,
         "endpoint": endpoint
-    }))
-    log_event("DSGA.Acknowledged", f"DSGA validated metadata for '{event.name}' and recorded endpoint.")
+    })))
+    entries.append(build_log_entry(
+        "DSGA.Acknowledged", f"DSGA validated metadata for '{event.name}' and recorded endpoint."
+    ))
 
-    other_members = Organization.objects.filter(member_ds=True).exclude(id=org.id)
-    recipients = list(other_members.values_list("name", flat=True))
+    recipients = [name for member_id, name in _ds_members() if member_id != org.id]
     # log_event("FederatedBroadcast", _pretty({
     #     "message": "New shared event available",
     #     "from": org.name,
@@ -204,20 +246,33 @@ def notify_trust_anchor_and_members(org: Organization, event: VolunteerEvent, en
     # }))
 
 # ---- Volunteer joins event scenario ----
+@lru_cache(maxsize=2048)
+def _display_name(name: str):
+    """Minimal name shared across orgs: 'First L.'"""
+    parts = name.split(" ", 1)
+    if len(parts) == 2:
+        return f"{parts[0]} {parts[1][0]}."
+    return name
+
+def _participation_record(action, system, record):
+    return build_log_entry(action, _pretty({"system": system, "record": record}))
+
 def log_volunteer_join(volunteer, event: VolunteerEvent, from_org: Organization, to_org: Organization, contract_id: str):
     """
     Simulates PlatformA volunteer joining PlatformB event via EDC.
     Logs both the subset data exchange and the dual participation records.
     """
+    entries = []
+
     # Step 1. PlatformA requests event catalog from PlatformB via EDC
-    log_event("EDC.CatalogRequest", _pretty({
+    entries.append(build_log_entry("EDC.CatalogRequest", _pretty({
         "from": from_org.name,
         "to": to_org.name,
         "request": "list available events",
-    }))
+    })))
 
     # Step 2. PlatformB provides event metadata + contract offer
-    log_event("EDC.CatalogResponse", _pretty({
+    entries.append(build_log_entry("EDC.CatalogResponse", _pretty({
         "from": to_org.name,
         "to": from_org.name,
         "event": {
@@ -227,61 +282,52 @@ def log_volunteer_join(volunteer, event: VolunteerEvent, from_org: Organization,
             "Time": f"{event.duration_hours}h",
         },
         "contract_offer": contract_id
-    }))
+    })))
 
     # Step 3. Contract negotiation and agreement
-    log_event("EDC.ContractNegotiated", _pretty({
+    entries.append(build_log_entry("EDC.ContractNegotiated", _pretty({
         "between": [from_org.name, to_org.name],
         "contract_id": contract_id,
         "purpose": "volunteer_matching",
         "data_minimization": "only VolunteerID + Name shared to host",
         "retention": "until event_finished or max 6 months",
         "note": f"Agreement reached via EDC connector. {to_org.name} cannot request full profile."
-    }))
+    })))
 
     # Step 4. Volunteer signs up — PlatformA only shares agreed subset
-    parts = volunteer.name.split(" ", 1)
-    if len(parts) == 2:
-        display_name = f"{parts[0]} {parts[1][0]}."
-    else:
-        display_name = volunteer.name
+    display_name = _display_name(volunteer.name)
 
     shared_subset = {
         "VolunteerID": str(volunteer.id),
         "Name": display_name,
     }
-    log_event("Participation.Requested", _pretty({
+    entries.append(build_log_entry("Participation.Requested", _pretty({
         "from": from_org.name,
         "to": to_org.name,
         "contract_used": contract_id,
         "volunteer_subset": shared_subset,
         "note": "Full profile (contact, history) stays at PlatformA"
-    }))
+    })))
 
     # Step 5. Both sides record participation locally
     # Volunteer org keeps richer event context
-    log_event("Participation.Recorded", _pretty({
-        "system": from_org.name,
-        "record": {
-            "VolunteerID": volunteer.id,
-            "VolunteerName": display_name,
-            "EventID": event.id,
-            "EventName": event.name,
-            "EventLocation": event.location,
-            "EventDuration": f"{event.duration_hours}h",
-            "status": "joined"
-        }
+    entries.append(_participation_record("Participation.Recorded", from_org.name, {
+        "VolunteerID": volunteer.id,
+        "VolunteerName": display_name,
+        "EventID": event.id,
+        "EventName": event.name,
+        "EventLocation": event.location,
+        "EventDuration": f"{event.duration_hours}h",
+        "status": "joined"
     }))
     # Event org keeps minimal participant info
-    log_event("Participation.Recorded", _pretty({
-        "system": to_org.name,
-        "record": {
-            "EventID": event.id,
-            "ParticipantID": volunteer.id,
-            "ParticipantName": display_name,
-            "status": "confirmed"
-        }
+    entries.append(_participation_record("Participation.Recorded", to_org.name, {
+        "EventID": event.id,
+        "ParticipantID": volunteer.id,
+        "ParticipantName": display_name,
+        "status": "confirmed"
     }))
+    log_events(entries)
 
 
 def log_volunteer_cancel(volunteer, event: VolunteerEvent, from_org: Organization, to_org: Organization):
@@ -289,14 +335,12 @@ def log_volunteer_cancel(volunteer, event: VolunteerEvent, from_org: Organizatio
     Simulates a volunteer cancelling participation in a cross-org event.
     Logs withdrawal of subset data and dual record deletion.
     """
+    entries = []
+
     # Step 1. PlatformA notifies PlatformB of cancellation
-    parts = volunteer.name.split(" ", 1)
-    if len(parts) == 2:
-        display_name = f"{parts[0]} {parts[1][0]}."
-    else:
-        display_name = volunteer.name
+    display_name = _display_name(volunteer.name)
 
-    log_event("Participation.Cancelled", _pretty({
+    entries.append(build_log_entry("Participation.Cancelled", _pretty({
         "from": from_org.name,
         "to": to_org.name,
         "volunteer_subset": {
@@ -304,28 +348,22 @@ def log_volunteer_cancel(volunteer, event: VolunteerEvent, from_org: Organizatio
             "Name": display_name
         },
         "note": "Only minimal subset used; full profile remains at PlatformA"
-    }))
+    })))
 
     # Step 2. Both systems update their records
 
     # Volunteer’s org updates its richer local record
-    log_event("Participation.RecordUpdated", _pretty({
-        "system": from_org.name,
-        "record": {
-            "VolunteerID": volunteer.id,
-            "EventID": event.id,
-            "EventName": event.name,
-            "status": "cancelled"
-        }
+    entries.append(_participation_record("Participation.RecordUpdated", from_org.name, {
+        "VolunteerID": volunteer.id,
+        "EventID": event.id,
+        "EventName": event.name,
+        "status": "cancelled"
     }))
 
     # Event’s org updates only the minimal record
-    log_event("Participation.RecordUpdated", _pretty({
-        "system": to_org.name,
-        "record": {
-            "EventID": event.id,
-            "ParticipantID": volunteer.id,
-            "status": "cancelled"
-        }
+    entries.append(_participation_record("Participation.RecordUpdated", to_org.name, {
+        "EventID": event.id,
+        "ParticipantID": volunteer.id,
+        "status": "cancelled"
     }))
-
+    log_events(entries)
@@ -1,10 +1,33 @@
 from functools import wraps
 from django.shortcuts import redirect
+from django.utils.functional import SimpleLazyObject
+
+from vms.models import Volunteer
+
+
+def session_volunteer(request):
+    """
+    The logged-in volunteer with its organization joined in, or None.
+    Loaded once per request and shared by request.volunteer and the
+    current_volunteer context processor, so both see the same row and columns.
+    """
+    if not hasattr(request, "_cached_volunteer"):
+        vid = request.session.get("volunteer_id")
+        request._cached_volunteer = (
+            Volunteer.objects.select_related("organization").filter(pk=vid).first() if vid else None
+        )
+    return request._cached_volunteer
+
 
 def volunteer_login_required(view_func):
+    """
+    Redirect to login without a session; otherwise expose the logged-in volunteer
+    (see session_volunteer) as request.volunteer, loaded on first access.
+    """
     @wraps(view_func)
     def wrapper(request, *args, **kwargs):
         if "volunteer_id" not in request.session:
             return redirect("vms:login")
+        request.volunteer = SimpleLazyObject(lambda: session_volunteer(request))
         return view_func(request, *args, **kwargs)
     return wrapper
@@ -0,0 +1,101 @@
+# vms/services/log_queue.py
+import atexit
+import logging
+import os
+import queue
+import signal
+import threading
+import time
+
+from django.db import close_old_connections
+
+from vms.models import LogEntry
+
+FLUSH_INTERVAL = 0.25  # seconds a queued entry may wait before being written
+BATCH_SIZE = 100
+
+logger = logging.getLogger(__name__)
+
+_LOG_Q = queue.Queue()
+_write_lock = threading.Lock()  # one batch INSERT at a time (worker vs. flush())
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def enqueue(entry):
+    """Queue an unsaved LogEntry; a background thread writes it within FLUSH_INTERVAL."""
+    _ensure_worker()
+    _LOG_Q.put_nowait(entry)
+
+
+def flush():
+    """
+    Write everything still queued, in the calling thread, then wait until the batch
+    the worker may already have taken off the queue is written too (shutdown, tests).
+    """
+    batch = _drain(block=False)
+    while batch:
+        _write(batch)
+        batch = _drain(block=False)
+    # entries are only marked done once written, so this also covers a batch the
+    # worker is still collecting (up to FLUSH_INTERVAL) or inserting
+    _LOG_Q.join()
+
+
+def _drain(block):
+    """Take up to BATCH_SIZE entries; with block=True wait up to FLUSH_INTERVAL for them."""
+    batch = []
+    deadline = time.monotonic() + FLUSH_INTERVAL
+    while len(batch) < BATCH_SIZE:
+        timeout = deadline - time.monotonic()
+        try:
+            if block and timeout > 0:
+                batch.append(_LOG_Q.get(timeout=timeout))
+            else:
+                batch.append(_LOG_Q.get_nowait())
+        except queue.Empty:
+            break
+    return batch
+
+
+def _write(batch):
+    with _write_lock:
+        try:
+            close_old_connections()
+            LogEntry.objects.bulk_create(batch, ignore_conflicts=True)
+        except Exception:
+            logger.exception("Dropped %d log entries", len(batch))
+        finally:
+            for _ in batch:
+                _LOG_Q.task_done()
+
+
+def _run():
+    while True:
+        batch = _drain(block=True)
+        if batch:
+            _write(batch)
+
+
+def _ensure_worker():
+    global _worker
+    if _worker is not None:
+        return
+    with _worker_lock:
+        if _worker is None:
+            _worker = threading.Thread(target=_run, name="vms-log-writer", daemon=True)
+            _worker.start()
+
+
+def _on_sigterm(signum, frame):
+    flush()
+    signal.signal(signum, signal.SIG_DFL)
+    os.kill(os.getpid(), signum)
+
+
+def install_shutdown_hooks():
+    """Flush on interpreter exit and on SIGTERM (unless something else already handles SIGTERM)."""
+    atexit.register(flush)
+    if threading.current_thread() is threading.main_thread() \
+            and signal.getsignal(signal.SIGTERM) is signal.SIG_DFL:
+        signal.signal(signal.SIGTERM, _on_sigterm)
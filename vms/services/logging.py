@@ -1,10 +1,73 @@
+import orjson
+from django.conf import settings
+
+from vms.encoders import dumps
 from vms.models import LogEntry
+from vms.services import log_queue
+
+_LEVELS = {"DEBUG": 10, "INFO": 20, "WARN": 30, "ERROR": 40}
+
+
+def log_json_option():
+    """orjson option for structured log details: 2-space indent under DEBUG, compact otherwise."""
+    return orjson.OPT_INDENT_2 if settings.DEBUG else 0
+
+
+class LazyJSON:
+    """
+    Structured log details, serialized (see log_json_option) only when turned into a string.
+    `data` may also be a zero-argument callable, so the details are only built
+    if the entry is actually recorded.
+    """
+    __slots__ = ("data",)
+
+    def __init__(self, data):
+        self.data = data
+
+    def __str__(self):
+        data = self.data() if callable(self.data) else self.data
+        return dumps(data, option=log_json_option()).decode()
+
+
+def log_enabled(level):
+    """Entries below settings.VMS_LOG_LEVEL (default DEBUG: record everything) are skipped."""
+    threshold = getattr(settings, "VMS_LOG_LEVEL", "DEBUG")
+    return _LEVELS.get(level, 0) >= _LEVELS.get(threshold, 0)
+
+
+def log_async():
+    return getattr(settings, "VMS_LOG_ASYNC", False)
 
 
 def log_event(action, details="", level="INFO"):
     """
-    Create a LogEntry; details should be a string (JSON if structured).
+    Create a LogEntry; details should be a string (JSON if structured) or a LazyJSON.
     Keep messages clear for presentation in defense.
+    Returns None when the level is below VMS_LOG_LEVEL (details are then never built).
+    With VMS_LOG_ASYNC the entry is queued and written shortly after by log_queue.
     """
-    entry = LogEntry.objects.create(action=action, details=details, level=level)
+    if not log_enabled(level):
+        return None
+    entry = LogEntry(action=action, details=str(details), level=level)
+    if log_async():
+        log_queue.enqueue(entry)
+    else:
+        entry.save()
     return entry
+
+
+def build_log_entry(action, details="", level="INFO"):
+    """Unsaved LogEntry, to be written together with others via log_events()."""
+    return LogEntry(action=action, details=details, level=level)
+
+
+def log_events(entries):
+    """Write several LogEntry objects in one INSERT (multi-step flows); bulk_create is atomic."""
+    entries = [e for e in entries if log_enabled(e.level)]
+    for e in entries:
+        e.details = str(e.details)
+    if log_async():
+        for e in entries:
+            log_queue.enqueue(e)
+        return entries
+    return LogEntry.objects.bulk_create(entries)
@@ -1,3 +1,354 @@
-from django.test import TestCase
+import hashlib
+import time
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+import orjson
+from django.core.cache import cache
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from . import views_edc
+from .events import annotate_events
+from .models import Certificate, LogEntry, Organization, Skill, Volunteer, VolunteerEvent
+from .services import log_queue
+from .services.logging import LazyJSON, build_log_entry, log_event, log_events
+
+
+class ListingFixtureMixin:
+    """Two Data Space members, a manager of the first and a mix of own/shared events."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.home = Organization.objects.create(name="PlatformA", member_ds=True)
+        cls.other = Organization.objects.create(name="PlatformB", member_ds=True)
+        cls.first_aid = Skill.objects.create(label="First Aid")
+        cls.cpr = Skill.objects.create(label="CPR")
+        cls.volunteer = Volunteer.objects.create(
+            name="Alvaro", password="secret", organization=cls.home, is_manager=True
+        )
+        cls.volunteer.skills.add(cls.first_aid)
+
+    def setUp(self):
+        cache.clear()
+
+    def add_events(self, count):
+        for i in range(count):
+            event = VolunteerEvent.objects.create(
+                name=f"E{i}", image="x.jpg", organization=self.home if i % 2 else self.other,
+            )
+            event.skills.add(self.first_aid, self.cpr)
+            event.volunteers.add(self.volunteer)
+
+
+class ListingQueryCountTests(ListingFixtureMixin, TestCase):
+    """The listing pages run a fixed number of queries, however many events there are."""
+
+    # session, volunteer, volunteer skills, events (+ EXISTS/COUNT), event skills
+    QUERIES = 5
+
+    def setUp(self):
+        super().setUp()
+        self.client.post(reverse("vms:login"), {"name": "alvaro", "password": "secret"})
+
+    def assert_page_queries(self, url_name):
+        url = reverse(url_name, args=[self.volunteer.id])
+        for count in (2, 10):
+            self.add_events(count)
+            with self.assertNumQueries(self.QUERIES):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+
+    def test_dashboard(self):
+        self.assert_page_queries("vms:dashboard")
+
+    def test_events_page(self):
+        self.assert_page_queries("vms:events_page")
+
+
+class AnnotateEventsTests(ListingFixtureMixin, TestCase):
+    def listed(self):
+        return list(
+            VolunteerEvent.objects.visible_to(self.home)
+            .with_registration(self.volunteer).with_counts().order_by("id")
+        )
+
+    def test_skill_status_and_eligibility(self):
+        covered = VolunteerEvent.objects.create(name="Covered", image="x.jpg", organization=self.home)
+        covered.skills.add(self.first_aid)
+        missing = VolunteerEvent.objects.create(
+            name="Missing", image="x.jpg", organization=self.other, isShared=True
+        )
+        missing.skills.add(self.first_aid, self.cpr)
+        missing.volunteers.add(self.volunteer)
+
+        covered, missing = annotate_events(self.listed(), self.volunteer)
+
+        self.assertEqual(covered.skill_status, {"First Aid": "has"})
+        self.assertEqual(covered.missing_skills, [])
+        self.assertTrue(covered.can_register)
+        self.assertFalse(covered.is_registered)
+        self.assertFalse(covered.is_federated)
+
+        self.assertEqual(missing.skill_status, {"First Aid": "has", "CPR": "missing"})
+        self.assertEqual(missing.missing_skills, ["CPR"])
+        self.assertFalse(missing.can_register)
+        self.assertTrue(missing.is_registered)
+        self.assertTrue(missing.is_federated)
+
+    def test_event_without_skills(self):
+        VolunteerEvent.objects.create(name="Open", image="x.jpg", organization=self.home)
+
+        (event,) = annotate_events(self.listed(), self.volunteer)
+
+        self.assertEqual(event.skill_status, {})
+        self.assertTrue(event.can_register)
+
+
+class LoginViewTests(ListingFixtureMixin, TestCase):
+    def test_correct_password_logs_in(self):
+        response = self.client.post(reverse("vms:login"), {"name": "alvaro", "password": "secret"})
+
+        self.assertRedirects(response, reverse("vms:dashboard", args=[self.volunteer.id]))
+        self.assertEqual(self.client.session["volunteer_id"], self.volunteer.id)
+
+    def test_wrong_password_is_rejected(self):
+        response = self.client.post(reverse("vms:login"), {"name": "alvaro", "password": "wrong"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFormError(response.context["form"], None, "Invalid name or password")
+        self.assertNotIn("volunteer_id", self.client.session)
+
+
+class CreateEventSkillsTests(ListingFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.post(reverse("vms:login"), {"name": "alvaro", "password": "secret"})
+
+    def test_skills_are_reused_created_and_deduplicated(self):
+        skills_before = Skill.objects.count()
+
+        self.client.post(reverse("vms:create_event"), {
+            "name": "Shelter", "duration": "3", "skills": "First Aid, Cooking, First Aid, ",
+        })
+
+        event = VolunteerEvent.objects.get(name="Shelter")
+        self.assertEqual(
+            sorted(event.skills.values_list("label", flat=True)), ["Cooking", "First Aid"]
+        )
+        self.assertIn(self.first_aid, event.skills.all())
+        self.assertEqual(Skill.objects.count(), skills_before + 1)
+        self.assertTrue(LogEntry.objects.filter(action="EventCreated").exists())
+
+
+class CertificateRequestTests(ListingFixtureMixin, TestCase):
+    def request_certificate(self, events):
+        return self.client.post(
+            reverse("vms:api_certificate_request"),
+            orjson.dumps({"volunteer_id": self.volunteer.id, "items": [{"id": e.id} for e in events]}),
+            content_type="application/json",
+        )
+
+    def finished_event(self, name, hours, org):
+        event = VolunteerEvent.objects.create(
+            name=name, image="x.jpg", organization=org, duration_hours=hours, isFinished=True
+        )
+        event.skills.add(self.first_aid)
+        event.volunteers.add(self.volunteer)
+        return event
+
+    def test_contract_id_and_proof(self):
+        events = [
+            self.finished_event("Long", 80, self.home),
+            self.finished_event("Short", 40, self.other),
+        ]
+
+        response = self.request_certificate(events)
+
+        self.assertEqual(response.status_code, 200)
+        data = orjson.loads(response.content)
+        self.assertEqual(data["status"], "issued")
+        expected_contract = hashlib.blake2b(
+            f"credential-{self.volunteer.id}-120".encode(), digest_size=6
+        ).hexdigest()
+        self.assertEqual(data["contract_id"], expected_contract)
+
+        cert = Certificate.objects.get(volunteer=self.volunteer)
+        self.assertEqual(
+            cert.items,
+            [
+                {"event_id": e.id, "event_name": e.name, "hours": e.duration_hours,
+                 "provider": e.organization.name, "skills": ["First Aid"]}
+                for e in events
+            ],
+        )
+        # compact, key-sorted JSON of the items, whatever order the keys were built in
+        canonical = orjson.dumps(cert.items, option=orjson.OPT_SORT_KEYS)
+        self.assertEqual(cert.proof_hash, hashlib.sha256(canonical).hexdigest())
+        self.assertEqual(data["certificate"]["vms:items"], cert.items)
+
+    def test_below_milestone_is_rejected(self):
+        response = self.request_certificate([self.finished_event("Short", 40, self.home)])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(orjson.loads(response.content)["status"], "rejected")
+        self.assertFalse(Certificate.objects.exists())
+
+
+class ORJSONFieldTests(TestCase):
+    def test_json_fields_round_trip(self):
+        metadata = {"name": "Plataforma ñ", "tags": ["a", 1, None], "nested": {"ok": True}}
+        org = Organization.objects.create(
+            name="PlatformC", metadata_json={**metadata, "rate": Decimal("1.50")}
+        )
+        org.refresh_from_db()
+        # Decimal falls back to DjangoJSONEncoder: stored as its string value
+        self.assertEqual(org.metadata_json, {**metadata, "rate": "1.50"})
+
+        volunteer = Volunteer.objects.create(name="Bea", organization=org)
+        items = [{"event_id": 1, "event_name": "Café", "hours": 12, "skills": []}]
+        cert = Certificate.objects.create(volunteer=volunteer, items=items)
+        cert.refresh_from_db()
+        self.assertEqual(cert.items, items)
+        self.assertEqual(Certificate.objects.filter(items__0__hours=12).get(), cert)
+
+
+class OnboardOrganizationRejectionTests(TestCase):
+    def post(self, body):
+        return self.client.post(
+            reverse("vms:api_onboard_organization"), body, content_type="application/json"
+        )
+
+    def assert_rejected(self, body, reason):
+        response = self.post(body)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(orjson.loads(response.content), {"status": "rejected", "reason": reason})
+        self.assertEqual(
+            list(LogEntry.objects.order_by("id").values_list("action", "level")),
+            [("OnboardingRequestReceived", "INFO"), ("OnboardingRejected", "WARN")],
+        )
+        self.assertFalse(Organization.objects.exists())
+
+    def test_invalid_json(self):
+        self.assert_rejected(b"{not json", "Body is not valid JSON")
+
+    def test_not_an_object(self):
+        self.assert_rejected(b'["name"]', "Body must be a JSON object")
+
+    def test_missing_fields(self):
+        self.assert_rejected(
+            orjson.dumps({"name": "PlatformC", "contact_email": ""}),
+            "Missing fields: ['contact_email', 'connector_endpoint']",
+        )
+
+    def test_fields_must_be_strings(self):
+        self.assert_rejected(
+            orjson.dumps({"name": "PlatformC", "contact_email": ["a@b.c"], "connector_endpoint": 8080}),
+            "Fields must be strings: ['contact_email', 'connector_endpoint']",
+        )
+
+    def test_get_is_rejected(self):
+        response = self.client.get(reverse("vms:api_onboard_organization"))
+
+        self.assertEqual(response.status_code, 400)
+
+
+class LogsApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        LogEntry.objects.bulk_create(
+            LogEntry(action=f"Step.{i}", details=f"d{i}", timestamp=now + timedelta(seconds=i))
+            for i in range(5)
+        )
+
+    def get_logs(self, **params):
+        response = self.client.get(reverse("vms:api_get_logs"), params)
+        self.assertTrue(response.streaming)
+        return orjson.loads(b"".join(response.streaming_content))
+
+    def test_newest_first_with_limit(self):
+        data = self.get_logs(limit=3)
+
+        self.assertEqual(data["count"], 3)
+        self.assertEqual([e["action"] for e in data["entries"]], ["Step.4", "Step.3", "Step.2"])
+        self.assertEqual(set(data["entries"][0]), {"timestamp", "level", "action", "details"})
+
+    def test_rows_split_over_several_chunks(self):
+        for chunk in (1, 2, 5):
+            with self.subTest(chunk=chunk), mock.patch.object(views_edc, "LOG_STREAM_CHUNK", chunk):
+                data = self.get_logs(limit=50)
+                self.assertEqual(data["count"], 5)
+                self.assertEqual(len(data["entries"]), 5)
+
+    def test_empty_window(self):
+        self.assertEqual(self.get_logs(limit=0), {"entries": [], "count": 0})
+
+
+class LogEventsTests(TestCase):
+    def test_one_insert_for_many_entries(self):
+        entries = [build_log_entry(f"Step.{i}", LazyJSON({"i": i})) for i in range(4)]
+
+        with self.assertNumQueries(1):
+            log_events(entries)
+
+        self.assertEqual(
+            list(LogEntry.objects.order_by("id").values_list("details", flat=True)),
+            ['{"i":0}', '{"i":1}', '{"i":2}', '{"i":3}'],
+        )
+
+    @override_settings(VMS_LOG_LEVEL="WARN")
+    def test_entries_below_the_level_are_skipped(self):
+        with self.assertNumQueries(1):
+            written = log_events([
+                build_log_entry("Quiet", "x", level="DEBUG"),
+                build_log_entry("Note", "x"),
+                build_log_entry("Problem", "x", level="WARN"),
+            ])
+
+        self.assertEqual([e.action for e in written], ["Problem"])
+        self.assertEqual(list(LogEntry.objects.values_list("action", flat=True)), ["Problem"])
+        self.assertIsNone(log_event("Note", "x"))
+
+
+class LogQueueFlushTests(TransactionTestCase):
+    """The worker writes on its own connection, so rows must really be committed."""
+
+    def queued(self):
+        return LogEntry.objects.filter(action__startswith="Queued.")
+
+    def test_flush_waits_for_the_worker_batch(self):
+        for i in range(3):
+            log_queue.enqueue(LogEntry(action=f"Queued.{i}"))
+        # let the worker take the entries off the queue; it now waits up to
+        # FLUSH_INTERVAL for more before writing them
+        time.sleep(log_queue.FLUSH_INTERVAL / 5)
+
+        log_queue.flush()
+
+        self.assertEqual(self.queued().count(), 3)
+
+    def test_flush_writes_more_than_one_batch(self):
+        count = log_queue.BATCH_SIZE * 2 + 5
+        for i in range(count):
+            log_queue.enqueue(LogEntry(action=f"Queued.{i}"))
+
+        log_queue.flush()
+
+        self.assertEqual(self.queued().count(), count)
+
+    @override_settings(VMS_LOG_ASYNC=True)
+    def test_async_log_event_and_log_events_are_queued(self):
+        entry = log_event("Queued.single", LazyJSON({"a": 1}))
+        log_events([build_log_entry("Queued.bulk.0"), build_log_entry("Queued.bulk.1")])
+
+        log_queue.flush()
+
+        self.assertEqual(entry.details, '{"a":1}')
+        self.assertEqual(
+            sorted(self.queued().values_list("action", flat=True)),
+            ["Queued.bulk.0", "Queued.bulk.1", "Queued.single"],
+        )
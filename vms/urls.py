@@ -1,9 +1,7 @@
 # vms/urls.py
 from django.urls import path
 
-# Import your separated view modules
-from . import views_ui
-from . import views_edc
+from . import views_edc, views_ui
 
 app_name = "vms"
 
@@ -18,9 +16,8 @@ urlpatterns = [
     path("onboard/<int:vid>/", views_ui.onboard_view, name="onboard"),
     path("logs/", views_ui.logs_view, name="logs_view"),
     path("events/create/", views_ui.create_event, name="create_event"),
-path("volunteer/<int:vid>/event/<int:eid>/finish/", views_ui.finish_event, name="finish_event"),
-path('ranking/', views_ui.ranking_view, name='ranking'),
-
+    path("volunteer/<int:vid>/event/<int:eid>/finish/", views_ui.finish_event, name="finish_event"),
+    path("ranking/", views_ui.ranking_view, name="ranking"),
 
     # Volunteer actions
     path("api/register-volunteer/", views_ui.api_register_volunteer, name="api_register_volunteer"),
@@ -33,14 +30,10 @@ path('ranking/', views_ui.ranking_view, name='ranking'),
     path("api/volunteer/<int:vid>/certificate/context/", views_ui.api_certificate_context, name="api_certificate_context"),
     path("api/certificate/request/", views_ui.api_certificate_request, name="api_certificate_request"),
 
-
-
-
     # ---------------- EDC / CONNECTOR ROUTES ----------------
     path("api/onboard-organization/", views_edc.api_onboard_organization, name="api_onboard_organization"),
     path("api/logs/", views_edc.api_get_logs, name="api_get_logs"),
     path("api/catalog/<int:org_id>/", views_edc.api_catalog, name="api_catalog"),
     path("api/catalog/<int:org_id>/events/<int:event_id>/", views_edc.api_event_detail, name="api_event_detail"),
     path("volunteer/<int:volunteer_id>/toggle-dataspace/", views_edc.toggle_dataspace, name="toggle_dataspace"),
-
 ]
@@ -1,14 +1,168 @@
 # vms/views_edc.py
 import hashlib
-import json
 
-from django.http import JsonResponse, HttpResponseBadRequest
+import orjson
+from django.db import transaction
+from django.http import HttpResponseBadRequest, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect
 from django.views.decorators.csrf import csrf_exempt
-from django.views.decorators.http import require_POST
 
-from vms.models import LogEntry, Organization, Volunteer
-from vms.services.logging import log_event
+from vms.encoders import ORJSONResponse, dumps
+from vms.models import LogEntry, Organization, Volunteer, VolunteerEvent
+from vms.services.logging import LazyJSON, build_log_entry, log_event, log_events
+
+
+# Fixed onboarding examples (mapping, JSON-LD, ESCO, policies); shared by every request, treat as read-only
+_SAMPLE_VOLUNTEER = {
+    "name": "Alvaro Juan Gomez",
+    "email_address": "alvaro@example.org",
+    "hours_served": 99,
+    "skills_list": ["First Aid", "Lead a Team"],
+    "org_membership": "Mima"
+}
+
+_SCHEMA_MAPPING = [
+    {"local_field": "name", "mapped_to": ["schema:givenName", "schema:familyName"], "sample_value": "Alvaro, Juan Gomez"},
+    {"local_field": "email_address", "mapped_to": ["schema:email"], "sample_value": _SAMPLE_VOLUNTEER["email_address"]},
+    {"local_field": "skills_list", "mapped_to": ["schema:skills"], "sample_value": ", ".join(_SAMPLE_VOLUNTEER["skills_list"])},
+    {"local_field": "org_membership", "mapped_to": ["schema:memberOf"], "sample_value": _SAMPLE_VOLUNTEER["org_membership"]},
+    {"local_field": "days_available", "mapped_to": ["vms:availabilityPreference"], "sample_value": "Weekends"},
+    {"local_field": "hours_available", "mapped_to": ["vms:availableHoursPerWeek"], "sample_value": 11},
+]
+
+_NORMALIZED_EXAMPLE = {
+    "@context": {
+        "schema": "https://schema.org/",
+        "esco": "http://data.europa.eu/esco/skill/",
+        "vms": "https://example.org/vms/"
+    },
+    "@type": "vms:Volunteer",
+    "@id": "https://mima.example/volunteers/123",
+    "schema:givenName": "Alvaro",
+    "schema:familyName": "Juan Gomez",
+    "schema:email": "alvaro@example.org",
+    "schema:memberOf": {
+        "@id": "https://vms.example.org/orgs/mima",
+        "schema:name": "Mima"
+    },
+    "vms:availabilityPreference": "Weekends",
+    "vms:availableHoursPerWeek": {
+        "schema:value": 11,
+        "schema:unitText": "hours"
+    },
+    "schema:skills": [
+        {
+            "@id": "http://data.europa.eu/esco/skill/f7464f30-662b-4177-85a0-3df9693e9e58",
+            "schema:name": "First Aid"
+        },
+        {
+            "@id": "http://data.europa.eu/esco/skill/1f1d2ff8-c4c1-45cc-9812-6a7ee84a73cb",
+            "schema:name": "Lead a Team"
+        },
+    ],
+    "schema:hasOccupation": [
+        {"@id": "https://vms.example.org/roles/beck-flood-relief-2025",
+         "@type": "vms:VolunteerRole",
+         "schema:roleName": "Field Team Leader",
+         "vms:hoursPerWeek": 11,
+
+         "schema:about": {
+             "@id": "https://vms.example.org/events/First-Aid-Force-2025",
+             "@type": "schema:Event",
+             "schema:name": "First Aid Force",
+             "schema:startDate": "2025-05-12",
+             "schema:endDate": "2025-08-15",
+             "schema:duration": "3M3D",
+             "schema:location": {
+                 "@type": "schema:Place",
+                 "schema:name": "Linz"
+             },
+             "schema:organizer": {
+                 "@type": "schema:Organization",
+                 "schema:name": "Mima"
+             },
+             "schema:maximumAttendeeCapacity": 20
+         },
+
+         "vms:requiresSkill": [
+             {"@id":
+                  "https://data.europa.eu/esco/skill/f7464f30-662b-4177-85a0-3df9693e9e58",
+              "schema:name": "First Aid"}
+         ]
+         }
+    ]
+}
+
+_ESCO_SKILLS = [
+    {
+        "label": "First Aid",
+        "uri": "http://data.europa.eu/esco/skill/f7464f30-662b-4177-85a0-3df9693e9e58"
+    },
+    {
+        "label": "Team Leadership",
+        "uri": "http://data.europa.eu/esco/skill/1f1d2ff8-c4c1-45cc-9812-6a7ee84a73cb"
+    },
+]
+
+_POLICY_CONTRACTS = {
+    "dataUsage": {
+        "allowedPurposes": ["volunteer_record_verification", "skill_matching"]
+    },
+    "retentionPolicy": {
+        "maxDuration": "36 months",
+        "renewable": True
+    },
+    "sharingPolicy": {
+        "canExposeEvents": True,
+        "audience": "dataspace-members",
+        "obligations": [
+            "mustProvidePrivacyPolicy",
+            "mustLogAccess"
+        ]
+    }
+}
+
+# Log details for the fixed examples, serialized once
+_SCHEMA_MAPPING_LOG = str(LazyJSON(_SCHEMA_MAPPING))
+_NORMALIZED_EXAMPLE_LOG = str(LazyJSON(_NORMALIZED_EXAMPLE))
+_ESCO_SKILLS_LOG = str(LazyJSON(_ESCO_SKILLS))
+_POLICY_CONTRACTS_LOG = str(LazyJSON(_POLICY_CONTRACTS))
+
+_ONBOARD_REQUIRED = ("name", "contact_email", "connector_endpoint")
+
+
+def _parse_onboard_payload(body):
+    """
+    Decode and validate an onboarding request in one go.
+    Returns (payload, None), or (None, reason) if the body is not a JSON object
+    with non-empty string values for all required fields.
+    """
+    try:
+        payload = orjson.loads(body)
+    except orjson.JSONDecodeError:
+        return None, "Body is not valid JSON"
+    if not isinstance(payload, dict):
+        return None, "Body must be a JSON object"
+    missing = [f for f in _ONBOARD_REQUIRED if not payload.get(f)]
+    if missing:
+        return None, f"Missing fields: {missing}"
+    wrong = [f for f in _ONBOARD_REQUIRED if not isinstance(payload[f], str)]
+    if wrong:
+        return None, f"Fields must be strings: {wrong}"
+    return payload, None
+
+
+def _catalog_endpoints(org):
+    """Catalog URL plus one endpoint per event; reads (name, id) rows, no model instances."""
+    catalog_url = f"{org.connector_endpoint.rstrip('/')}/api/catalog/{org.id}/"
+    events_prefix = catalog_url + "events/"
+    return {
+        "catalog": catalog_url,
+        "events": [
+            {"title": name, "endpoint": events_prefix + str(eid) + "/"}
+            for name, eid in org.events.values_list("name", "id")
+        ],
+    }
 
 
 @csrf_exempt
@@ -20,135 +174,49 @@ def api_onboard_organization(request):
     if request.method != "POST":
         return HttpResponseBadRequest("Use POST (JSON)")
 
-    payload = json.loads(request.body)
-    log_event("OnboardingRequestReceived", json.dumps(payload))
+    # every step's log entry is written in one INSERT when the request ends (log_events)
+    entries = []
+    payload, reason = _parse_onboard_payload(request.body)
+    entries.append(build_log_entry("OnboardingRequestReceived", request.body.decode(errors="replace")))
 
     # --------------------------------------------------
     # STEP 1 — Metadata validation
     # --------------------------------------------------
-    required = ["name", "contact_email", "connector_endpoint"]
-    missing = [f for f in required if not payload.get(f)]
-    if missing:
-        msg = {"status": "rejected", "reason": f"Missing fields: {missing}"}
-        log_event("OnboardingRejected", json.dumps(msg), level="WARN")
-        return JsonResponse(msg, status=400)
+    if reason:
+        msg = {"status": "rejected", "reason": reason}
+        entries.append(build_log_entry("OnboardingRejected", dumps(msg).decode(), level="WARN"))
+        log_events(entries)
+        return ORJSONResponse(msg, status=400)
 
-    log_event("MetadataValidation", f"All required fields present for {payload.get('name')}")
+    entries.append(build_log_entry("MetadataValidation", f"All required fields present for {payload.get('name')}"))
 
     # Governance validation
     if not payload.get("privacy_policy_url"):
-        log_event("GovernanceCheck", "Privacy policy missing", level="WARN")
+        entries.append(build_log_entry("GovernanceCheck", "Privacy policy missing", level="WARN"))
     else:
-        log_event("GovernanceCheck", f"Privacy policy present: {payload['privacy_policy_url']}")
+        entries.append(build_log_entry("GovernanceCheck", f"Privacy policy present: {payload['privacy_policy_url']}"))
 
     # --------------------------------------------------
     # STEP 2 — Volunteer schema mapping example
     # --------------------------------------------------
-    sample_volunteer = {
-        "name": "Alvaro Juan Gomez",
-        "email_address": "alvaro@example.org",
-        "hours_served": 99,
-        "skills_list": ["First Aid", "Lead a Team"],
-        "org_membership": "Mima"
-    }
-
-    schema_mapping = [
-        {"local_field": "name", "mapped_to": ["schema:givenName", "schema:familyName"], "sample_value": "Alvaro, Juan Gomez"},
-        {"local_field": "email_address", "mapped_to": ["schema:email"], "sample_value": sample_volunteer["email_address"]},
-        {"local_field": "skills_list", "mapped_to": ["schema:skills"], "sample_value": ", ".join(sample_volunteer["skills_list"])},
-        {"local_field": "org_membership", "mapped_to": ["schema:memberOf"], "sample_value": sample_volunteer["org_membership"]},
-        {"local_field": "days_available", "mapped_to": ["vms:availabilityPreference"], "sample_value": "Weekends"},
-        {"local_field": "hours_available", "mapped_to": ["vms:availableHoursPerWeek"], "sample_value": 11},
-    ]
-    log_event("VolunteerSchemaMapping", json.dumps(schema_mapping, indent=2))
+    entries.append(build_log_entry("VolunteerSchemaMapping", _SCHEMA_MAPPING_LOG))
 
     # --------------------------------------------------
     # STEP 2b — JSON-LD normalized example
     # --------------------------------------------------
-    normalized_example = {
-        "@context": {
-            "schema": "https://schema.org/",
-            "esco": "http://data.europa.eu/esco/skill/",
-            "vms": "https://example.org/vms/"
-        },
-        "@type": "vms:Volunteer",
-        "@id": "https://mima.example/volunteers/123",
-        "schema:givenName": "Alvaro",
-        "schema:familyName": "Juan Gomez",
-        "schema:email": "alvaro@example.org",
-        "schema:memberOf": {
-            "@id": "https://vms.example.org/orgs/mima",
-            "schema:name": "Mima"
-        },
-        "vms:availabilityPreference": "Weekends",
-        "vms:availableHoursPerWeek": {
-            "schema:value": 11,
-            "schema:unitText": "hours"
-        },
-        "schema:skills": [
-            {
-                "@id": "http://data.europa.eu/esco/skill/f7464f30-662b-4177-85a0-3df9693e9e58",
-                "schema:name": "First Aid"
-            },
-            {
-                "@id": "http://data.europa.eu/esco/skill/1f1d2ff8-c4c1-45cc-9812-6a7ee84a73cb",
-                "schema:name": "Lead a Team"
-            },
-        ],
-        "schema:hasOccupation": [
-            {"@id": "https://vms.example.org/roles/beck-flood-relief-2025",
-             "@type": "vms:VolunteerRole",
-             "schema:roleName": "Field Team Leader",
-             "vms:hoursPerWeek": 11,
-
-             "schema:about": {
-                 "@id": "https://vms.example.org/events/First-Aid-Force-2025",
-                 "@type": "schema:Event",
-                 "schema:name": "First Aid Force",
-                 "schema:startDate": "2025-05-12",
-                 "schema:endDate": "2025-08-15",
-                 "schema:duration": "3M3D",
-                 "schema:location": {
-                     "@type": "schema:Place",
-                     "schema:name": "Linz"
-                 },
-                 "schema:organizer": {
-                     "@type": "schema:Organization",
-                     "schema:name": "Mima"
-                 },
-                 "schema:maximumAttendeeCapacity": 20
-             },
-
-             "vms:requiresSkill": [
-                 {"@id":
-                      "https://data.europa.eu/esco/skill/f7464f30-662b-4177-85a0-3df9693e9e58",
-                  "schema:name": "First Aid"}
-             ]
-             }
-        ]
-    }
-
-    log_event("VolunteerSchemaNormalized", json.dumps(normalized_example, indent=2))
+    entries.append(build_log_entry("VolunteerSchemaNormalized", _NORMALIZED_EXAMPLE_LOG))
 
     # --------------------------------------------------
     # STEP 3 — ESCO enrichment
     # --------------------------------------------------
-    esco_log = [
-        {
-            "label": "First Aid",
-            "uri": "http://data.europa.eu/esco/skill/f7464f30-662b-4177-85a0-3df9693e9e58"
-        },
-        {
-            "label": "Team Leadership",
-            "uri": "http://data.europa.eu/esco/skill/1f1d2ff8-c4c1-45cc-9812-6a7ee84a73cb"
-        },
-    ]
-    log_event("ESCO_SkillMapping", json.dumps(esco_log, indent=2))
+    entries.append(build_log_entry("ESCO_SkillMapping", _ESCO_SKILLS_LOG))
 
     # --------------------------------------------------
     # STEP 4 — Realistic EDC-like usage contract
     # --------------------------------------------------
-    contract_id = f"tmpl-{hashlib.sha1(payload['name'].encode()).hexdigest()[:8]}"
+    # one digest of the name backs both the contract id and the certificate thumbprint
+    name_digest = hashlib.sha1(payload["name"].encode()).hexdigest()
+    contract_id = f"tmpl-{name_digest[:8]}"
 
     # This structure is now aligned with ODRL-style / EDC-style policies
     contract = {
@@ -169,145 +237,136 @@ def api_onboard_organization(request):
             "must_provide_privacy_policy"
         ]
     }
-    log_event("ContractTemplateGenerated", json.dumps(contract, indent=2))
+    entries.append(build_log_entry("ContractTemplateGenerated", LazyJSON(contract)))
 
     # --------------------------------------------------
     # STEP 4b — Policy negotiation (also realistic)
     # --------------------------------------------------
-    policy_contracts = {
-        "dataUsage": {
-            "allowedPurposes": ["volunteer_record_verification", "skill_matching"]
-        },
-        "retentionPolicy": {
-            "maxDuration": "36 months",
-            "renewable": True
-        },
-        "sharingPolicy": {
-            "canExposeEvents": True,
-            "audience": "dataspace-members",
-            "obligations": [
-                "mustProvidePrivacyPolicy",
-                "mustLogAccess"
-            ]
-        }
-    }
-    log_event("PolicyContractsNegotiated", json.dumps(policy_contracts, indent=2))
+    entries.append(build_log_entry("PolicyContractsNegotiated", _POLICY_CONTRACTS_LOG))
 
     # Negotiation confirmation
-    log_event("EDC.ContractNegotiated", json.dumps({
+    entries.append(build_log_entry("EDC.ContractNegotiated", LazyJSON({
         "between": [payload["name"], "TrustAnchor"],
         "contract_id": contract_id,
         "note": f"{payload['name']} may now share events and limited volunteer info under agreed terms."
-    }, indent=2))
+    })))
 
     # --------------------------------------------------
     # STEP 5 — Certificate thumbprint (mock trust evidence)
     # --------------------------------------------------
-    cert_thumbprint = hashlib.sha1(payload["name"].encode()).hexdigest().upper()[:32]
-    log_event("CertificateIssued", cert_thumbprint)
+    cert_thumbprint = name_digest.upper()[:32]
+    entries.append(build_log_entry("CertificateIssued", cert_thumbprint))
 
     # --------------------------------------------------
     # STEP 6 — Persist organization as Data Space member
     # --------------------------------------------------
     volunteer_id = request.session.get("volunteer_id")
     if not volunteer_id:
-        return JsonResponse({"status": "rejected", "reason": "No volunteer session found"}, status=400)
+        log_events(entries)
+        return ORJSONResponse({"status": "rejected", "reason": "No volunteer session found"}, status=400)
 
     vol = Volunteer.objects.get(pk=volunteer_id)
     org = vol.organization
     if not org:
-        return JsonResponse({"status": "rejected", "reason": "Volunteer has no organization"}, status=400)
+        log_events(entries)
+        return ORJSONResponse({"status": "rejected", "reason": "Volunteer has no organization"}, status=400)
 
     org.contact_email = payload["contact_email"]
     org.connector_endpoint = payload["connector_endpoint"]
     org.metadata_json = payload
     org.certificate_thumbprint = cert_thumbprint
     org.member_ds = True
-    org.save()
-
-    log_event("OnboardingApproved", f"{org.name} accepted into Data Space")
 
     # --------------------------------------------------
     # STEP 7 — Expose catalog endpoints
     # --------------------------------------------------
-    base = org.connector_endpoint.rstrip("/")
-    endpoints = {
-        "catalog": f"{base}/api/catalog/{org.id}/",
-        "events": [
-            {
-                "title": e.name,
-                "endpoint": f"{base}/api/catalog/{org.id}/events/{e.id}/"
-            }
-            for e in org.events.all()
-        ]
-    }
-    log_event("ExposedEndpoints", json.dumps(endpoints, indent=2))
+    endpoints = _catalog_endpoints(org)
+    entries.append(build_log_entry("OnboardingApproved", f"{org.name} accepted into Data Space"))
+    entries.append(build_log_entry("ExposedEndpoints", LazyJSON(endpoints)))
+    # atomic only covers inline log writes; with VMS_LOG_ASYNC the entries are queued
+    with transaction.atomic():
+        org.save()
+        log_events(entries)
 
-    return JsonResponse({
+    return ORJSONResponse({
         "status": "approved",
         "organization_id": org.id,
-        "volunteer_schema": schema_mapping,
-        "normalized_example": normalized_example,
+        "volunteer_schema": _SCHEMA_MAPPING,
+        "normalized_example": _NORMALIZED_EXAMPLE,
         "contract": contract,
-        "policy_contracts": policy_contracts,
+        "policy_contracts": _POLICY_CONTRACTS,
         "endpoints": endpoints,
         "certificate_thumbprint": cert_thumbprint,
-        "esco_skills": esco_log,
+        "esco_skills": _ESCO_SKILLS,
     })
 
 
+LOG_STREAM_CHUNK = 500  # rows fetched and sent per chunk by api_get_logs
+
+
+def _stream_log_rows(rows):
+    """
+    Encode values() rows as {"entries": [...], "count": n}, one chunk of rows at a time,
+    so memory stays flat however large the requested window is.
+    """
+    yield b'{"entries":['
+    count = 0
+    chunk = []
+    for row in rows.iterator(chunk_size=LOG_STREAM_CHUNK):
+        chunk.append(dumps(row))
+        if len(chunk) == LOG_STREAM_CHUNK:
+            yield (b"," if count else b"") + b",".join(chunk)
+            count += len(chunk)
+            chunk = []
+    if chunk:
+        yield (b"," if count else b"") + b",".join(chunk)
+        count += len(chunk)
+    yield b'],"count":%d}' % count
+
+
 def api_get_logs(request):
-    """Return recent log entries as JSON."""
+    """Return recent log entries as JSON (streamed)."""
     limit = int(request.GET.get("limit", 50))
-    logs = LogEntry.objects.all().order_by("-timestamp")[:limit]
-    return JsonResponse({
-        "count": len(logs),
-        "entries": [
-            {
-                "timestamp": l.timestamp.isoformat(),
-                "level": l.level,
-                "action": l.action,
-                "details": l.details
-            }
-            for l in logs
-        ]
-    })
+    # plain dicts straight from the cursor; no model instances
+    rows = LogEntry.objects.order_by("-timestamp").values("timestamp", "level", "action", "details")[:limit]
+    return StreamingHttpResponse(_stream_log_rows(rows), content_type="application/json")
 
 
 def api_catalog(request, org_id):
     org = get_object_or_404(Organization, pk=org_id)
-    base = org.connector_endpoint.rstrip("/")
-    events = [
-        {
-            "title": e.name,
-            "endpoint": f"{base}/api/catalog/{org.id}/events/{e.id}/"
-        }
-        for e in org.events.all()
-    ]
     catalog = {
         "org": org.to_jsonld(),
-        "endpoints": {
-            "catalog": f"{base}/api/catalog/{org.id}/",
-            "events": events
-        }
+        "endpoints": _catalog_endpoints(org),
     }
-    return JsonResponse(catalog)
+    return ORJSONResponse(catalog)
 
 
 def api_event_detail(request, org_id, event_id):
-    org = get_object_or_404(Organization, pk=org_id)
-    event = get_object_or_404(org.events, pk=event_id)
-    return JsonResponse(event.to_jsonld() | {
-        "skills_needed": event.skills_needed,
-        "organization": org.to_jsonld()
-    })
+    # event and its organization in one query, with just the columns both to_jsonld() read
+    event = get_object_or_404(
+        VolunteerEvent.objects.select_related("organization").only(
+            "id", "name", "location", "organization_id",
+            "organization__id", "organization__name", "organization__url",
+            "organization__contact_email", "organization__connector_endpoint"),
+        pk=event_id, organization_id=org_id,
+    )
+    doc = event.to_jsonld()
+    doc["skills_needed"] = list(event.skills.values_list("label", flat=True))
+    doc["organization"] = event.organization.to_jsonld()
+    return ORJSONResponse(doc)
 
 
 def toggle_dataspace(request, volunteer_id):
-    volunteer = get_object_or_404(Volunteer, pk=volunteer_id)
+    # org.save() below then only writes the loaded columns (member_ds, certificate_thumbprint)
+    volunteer = get_object_or_404(
+        Volunteer.objects.select_related("organization").only(
+            "id", "organization__id", "organization__name",
+            "organization__member_ds", "organization__certificate_thumbprint"),
+        pk=volunteer_id,
+    )
     org = volunteer.organization
     if not org:
-        return JsonResponse({"status": "error", "reason": "Volunteer has no organization"}, status=400)
+        return ORJSONResponse({"status": "error", "reason": "Volunteer has no organization"}, status=400)
 
     if org.member_ds:
         org.member_ds = False
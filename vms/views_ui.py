@@ -1,11 +1,18 @@
 import hashlib
+import hmac
+import logging
+from collections import defaultdict
+from operator import itemgetter
 
+import orjson
+from django.core.cache import cache
 from django.shortcuts import render
-from django.http import JsonResponse, HttpResponseBadRequest
+from django.http import HttpResponse, JsonResponse, HttpResponseBadRequest
 from django.views.decorators.http import require_POST
 
 from vms.services.decorators import volunteer_login_required
-from .models import Organization, Volunteer, VolunteerEvent, Skill, Certificate
+from .models import DSGA_ISSUER_CACHE_KEY, ORGS_JSON_CACHE_KEY, Organization, Volunteer, VolunteerEvent, Skill, Certificate
+from .encoders import ORJSONResponse, dumps
 from .forms import LoginForm
 import json
 from django.views.decorators.csrf import csrf_exempt
@@ -13,9 +20,10 @@ from django.views.decorators.csrf import csrf_exempt
 from django.shortcuts import get_object_or_404, redirect
 from django.contrib import messages
 
-from .events import annotate_event
-from .services.logging import log_event
+from .events import annotate_events
+from .services.logging import LazyJSON, build_log_entry, log_event, log_events, log_json_option
 
+from django.db.models import Max, Prefetch, Q, prefetch_related_objects
 from django.utils import timezone
 from vms.services.dataspace import (
     edc_register_asset_and_offer,
@@ -24,6 +32,17 @@ from vms.services.dataspace import (
     notify_trust_anchor_and_members, log_volunteer_join, log_volunteer_cancel,
 )
 
+logger = logging.getLogger(__name__)
+
+ORGS_JSON_TTL = 300  # seconds; also dropped whenever an Organization is saved/deleted
+DSGA_ISSUER_TTL = 3600  # seconds; also dropped whenever an Organization is saved/deleted
+
+# Columns read by partials/event_card.html and annotate_events (listing pages)
+_EVENT_CARD_FIELDS = (
+    "id", "name", "description", "location", "duration_hours", "isShared", "isFinished",
+    "ds_endpoint", "image", "organization__name",
+)
+
 
 # ---------------- UI Views ----------------
 @volunteer_login_required
@@ -36,12 +55,12 @@ def login_view(request):
         if form.is_valid():
             name = form.cleaned_data["name"].capitalize()
             password = form.cleaned_data["password"]
-            try:
-                v = Volunteer.objects.get(name=name)
+            # exact lookup on the indexed name column, then a constant-time password compare
+            v = Volunteer.objects.only("id", "password").filter(name=name).first()
+            if v is not None and hmac.compare_digest(v.password.encode(), password.encode()):
                 request.session["volunteer_id"] = v.id
                 return redirect("vms:dashboard", vid=v.id)
-            except Volunteer.DoesNotExist:
-                form.add_error(None, "Invalid name or password")
+            form.add_error(None, "Invalid name or password")
     else:
         form = LoginForm()
     return render(request, "vms/login.html", {"form": form})
@@ -52,14 +71,8 @@ def logout_view(request):
 
 @volunteer_login_required
 def ranking_view(request):
-    volunteer_id = request.session.get('volunteer_id')
-
-    if not volunteer_id:
-        return redirect('vms:login')
-
-    try:
-        volunteer = Volunteer.objects.get(id=volunteer_id)
-    except Volunteer.DoesNotExist:
+    volunteer = request.volunteer
+    if not volunteer:
         messages.error(request, "Volunteer not found.")
         return redirect('vms:login')
 
@@ -82,40 +95,39 @@ def ranking_view(request):
     return render(request, "vms/ranking.html", context)
 @volunteer_login_required
 def dashboard_view(request, vid):
-    v = get_object_or_404(Volunteer, pk=vid)
+    v = get_object_or_404(Volunteer.objects.for_profile(), pk=vid)
     org = v.organization
 
-    # --- collect events ---
-    org_events = org.events.all() if org else VolunteerEvent.objects.none()
-
-    if org and org.member_ds:
-        # Add shared events from other orgs in Data Space
-        ds_events = VolunteerEvent.objects.filter(
-            isShared=True,
-            organization__member_ds=True
-        ).exclude(organization=org)
-        all_events = org_events | ds_events
-    else:
-        all_events = org_events
-
-    registered_ids = set(v.events.values_list("id", flat=True))
+    # --- collect events: own org + shared events from other orgs in Data Space ---
+    # Registration is tagged per row in SQL; finished events the volunteer did not
+    # attend are not shown, so don't load them
+    all_events = list(
+        VolunteerEvent.objects.visible_to(org).with_registration(v)
+        .filter(Q(isFinished=False) | Q(is_registered=True))
+        .with_counts()
+        .only(*_EVENT_CARD_FIELDS)
+    )
 
     # Annotate
-    all_events = [annotate_event(e, v, registered_ids) for e in all_events]
-
-    # Split into registered/unregistered
-    registered_events = [e for e in all_events if e.is_registered]
-    unregistered_events = [e for e in all_events if not e.is_registered]
-
-    volunteers = org.volunteers.all() if org else Volunteer.objects.none()
+    annotate_events(all_events, v)
+
+    # Split into registered (active/completed) and upcoming unregistered, in one pass
+    registered_active, registered_completed, unregistered_upcoming = [], [], []
+    hours_volunteered = 0
+    for e in all_events:
+        if e.is_registered:
+            if e.isFinished:
+                registered_completed.append(e)
+                hours_volunteered += e.duration_hours
+            else:
+                registered_active.append(e)
+        elif not e.isFinished:
+            unregistered_upcoming.append(e)
 
     # Quick stats
-    registered_active = [e for e in registered_events if not e.isFinished]
-    registered_completed = [e for e in registered_events if e.isFinished]
 
     registered_events_count = len(registered_active)
     completed_events_count = len(registered_completed)
-    hours_volunteered = sum(e.duration_hours for e in registered_completed)
 
     # Milestone logic (example: 100 hours = milestone)
     milestone_target = 100
@@ -126,9 +138,8 @@ def dashboard_view(request, vid):
     return render(request, "vms/dashboard.html", {
         "volunteer": v,
         "events_registered": registered_active,
-        "events_unregistered": [e for e in unregistered_events if not e.isFinished],
+        "events_unregistered": unregistered_upcoming,
         "events_completed": registered_completed,
-        "volunteers": volunteers,
         "registered_events_count": registered_events_count,
         "completed_events_count": completed_events_count,
         "hours_volunteered": hours_volunteered,
@@ -142,43 +153,29 @@ def dashboard_view(request, vid):
 
 @volunteer_login_required
 def events_page(request, vid):
-    v = get_object_or_404(Volunteer, pk=vid)
+    v = get_object_or_404(Volunteer.objects.for_profile(), pk=vid)
     org = v.organization
 
-    # --- collect events ---
-    org_events = org.events.all() if org else VolunteerEvent.objects.none()
-
-    if org and org.member_ds:
-        ds_events = VolunteerEvent.objects.filter(
-            isShared=True, organization__member_ds=True
-        ).exclude(organization=org)
-        # if ds_events.exists():
-            # log_event("FederatedDiscovery",
-            #           f"Discovered {ds_events.count()} shared events from other orgs in Data Space for {org.name}")
-        all_events = org_events | ds_events
-    else:
-        all_events = org_events
-
-    registered_ids = set(v.events.values_list("id", flat=True))
-
-    # Annotate all events and filter out finished
-    all_events = [annotate_event(e, v, registered_ids) for e in all_events if not e.isFinished]
+    # --- collect events: own org + shared events from other orgs in Data Space ---
+    # Only upcoming events are listed; filter them in SQL and tag registration per row
+    all_events = list(
+        VolunteerEvent.objects.visible_to(org).filter(isFinished=False).with_registration(v).with_counts()
+        .only(*_EVENT_CARD_FIELDS)
+    )
+    annotate_events(all_events, v)
 
     return render(request, "vms/events.html", {
         "volunteer": v,
         "events": all_events,
     })
 
-def _pretty(data):
-    return json.dumps(data, indent=2, ensure_ascii=False)
-
 @volunteer_login_required
 def create_event(request):
-    volunteer_id = request.session.get("volunteer_id")
-    if not volunteer_id:
+    volunteer = request.volunteer
+    if not volunteer:
+        messages.error(request, "Volunteer not found.")
         return redirect("vms:login")
-
-    volunteer = get_object_or_404(Volunteer, pk=volunteer_id)
+    volunteer_id = volunteer.id
 
     if not volunteer.is_manager:
         messages.error(request, "Only managers can create events.")
@@ -205,56 +202,69 @@ def create_event(request):
             shared_since=timezone.now() if expose else None,
         )
 
-        # Attach skills
-        for s in [s.strip() for s in skills.split(",") if s.strip()]:
-            skill, _ = Skill.objects.get_or_create(label=s)
-            event.skills.add(skill)
-
-        log_event("EventCreated", f"Event '{event.name}' created by {volunteer.name}")
+        # Attach skills: one lookup, one INSERT for the new labels, one m2m add
+        labels = list(dict.fromkeys(s.strip() for s in skills.split(",") if s.strip()))
+        if labels:
+            by_label = {}
+            for skill in Skill.objects.filter(label__in=labels).order_by("id"):
+                by_label.setdefault(skill.label, skill)
+            new_skills = Skill.objects.bulk_create(
+                [Skill(label=label) for label in labels if label not in by_label]
+            )
+            by_label.update((skill.label, skill) for skill in new_skills)
+            event.skills.add(*(by_label[label] for label in labels))
+
+        # Every log line of this flow is written in one INSERT at the end
+        entries = [build_log_entry("EventCreated", f"Event '{event.name}' created by {volunteer.name}")]
 
         if expose:
             # 1) Register on connector
-            edc_info = edc_register_asset_and_offer(volunteer.organization, event)
+            edc_info = edc_register_asset_and_offer(volunteer.organization, event, entries)
             event.ds_endpoint = edc_info["endpoint"]
             event.ds_asset_id = edc_info["asset_id"]
             event.ds_contract_id = edc_info["contract_id"]
             event.save()
 
             # 2) Asset + Contract published (short logs only)
-            log_event("EDC.AssetRegistered", f"Asset {event.ds_asset_id} published for event '{event.name}'")
-            log_event("EDC.ContractOfferPublished", f"Contract {event.ds_contract_id} offered for event '{event.name}'")
+            entries.append(build_log_entry("EDC.AssetRegistered", f"Asset {event.ds_asset_id} published for event '{event.name}'"))
+            entries.append(build_log_entry("EDC.ContractOfferPublished", f"Contract {event.ds_contract_id} offered for event '{event.name}'"))
 
             # 3) Mapping log (short)
-            mapping = map_local_event_to_shared(volunteer.organization, event)
-            mapping_short = [
+            # load skills once; the mapping and the JSON-LD doc both read event.skills.all()
+            prefetch_related_objects(
+                [event], Prefetch("skills", queryset=Skill.objects.only("id", "label", "esco_uri"))
+            )
+            # the mapping only feeds this log entry, so it is built lazily
+            entries.append(build_log_entry("EventSchemaMapped", LazyJSON(lambda: [
                 {"local": m["local_field"], "mapped_to": m["mapped_to"], "sample": m["sample_value"]}
-                for m in mapping
-            ]
-            log_event("EventSchemaMapped", json.dumps(mapping_short, indent=2))
+                for m in map_local_event_to_shared(volunteer.organization, event)
+            ])))
 
             # 4) JSON-LD view (normalized event doc)
-            jsonld = build_event_jsonld(volunteer.organization, event, event.ds_endpoint, event.ds_asset_id,
-                                        event.ds_contract_id)
-            log_event("EventShared.JSONLD", json.dumps(jsonld, indent=2))
+            entries.append(build_log_entry("EventShared.JSONLD", dumps(build_event_jsonld(
+                volunteer.organization, event, event.ds_endpoint, event.ds_asset_id, event.ds_contract_id
+            ), log_json_option()).decode()))
 
             # 5) Catalog update
             # log_event("CatalogUpdated",
             #           f"{volunteer.organization.name} catalog now has {len(volunteer.organization.catalog()['events'])} events")
 
             # 6) Notify trust anchor + broadcast
-            notify_trust_anchor_and_members(volunteer.organization, event, event.ds_endpoint)
+            notify_trust_anchor_and_members(volunteer.organization, event, event.ds_endpoint, entries)
 
             # 7) Policy hint if applicable
             if event.prioritize_local:
-                log_event("PolicyHint", "Local-first constraint applied: volunteers from this org prioritized.")
+                entries.append(build_log_entry("PolicyHint", "Local-first constraint applied: volunteers from this org prioritized."))
         else:
-            log_event("EventPrivate", f"Event '{event.name}' remains local-only (not published to dataspace).")
+            entries.append(build_log_entry("EventPrivate", f"Event '{event.name}' remains local-only (not published to dataspace)."))
+
+        log_events(entries)
 
         messages.success(request, f"Event '{event.name}' created successfully!")
         return redirect("vms:dashboard", volunteer_id)
 
     # Defaults
-    next_id = (VolunteerEvent.objects.order_by("-id").first().id + 1) if VolunteerEvent.objects.exists() else 1
+    next_id = (VolunteerEvent.objects.aggregate(m=Max("id"))["m"] or 0) + 1
     defaults = {
         "name": f"Volunteer event nº {next_id}",
         "description": "Lorem ipsum dolor sit amet, consectetur adipiscing elit. Sed do eiusmod tempor.",
@@ -313,16 +323,38 @@ def api_register_volunteer(request):
 
 @csrf_exempt
 def api_import_history(request, vid):
-    print("importing history from {}".format(vid))
-    pass
+    logger.debug("importing history from %s", vid)
+    # not implemented yet; answer instead of returning None (which Django turns into a 500)
+    return JsonResponse({"status": "stub", "volunteer_id": vid})
+
+
+
+_PARTICIPATION_ORG_FIELDS = ("organization__id", "organization__name", "organization__member_ds")
 
 
+def _participation_pair(vid, eid):
+    """
+    Volunteer and event for register/unregister, with both organizations joined in
+    and only the columns the dataspace join/cancel logs read.
+    """
+    v = get_object_or_404(
+        Volunteer.objects.select_related("organization")
+        .only("id", "name", "organization_id", *_PARTICIPATION_ORG_FIELDS),
+        pk=vid,
+    )
+    event = get_object_or_404(
+        VolunteerEvent.objects.select_related("organization")
+        .only("id", "name", "location", "duration_hours", "ds_contract_id", "organization_id",
+              *_PARTICIPATION_ORG_FIELDS),
+        pk=eid,
+    )
+    return v, event
+
 
 @volunteer_login_required
 def register_event(request, vid, eid):
     """Register a volunteer to an event and log dataspace interactions."""
-    v = get_object_or_404(Volunteer, pk=vid)
-    event = get_object_or_404(VolunteerEvent, pk=eid)
+    v, event = _participation_pair(vid, eid)
 
     if request.method == "POST":
         v.events.add(event)
@@ -343,8 +375,7 @@ def register_event(request, vid, eid):
 @volunteer_login_required
 def unregister_event(request, vid, eid):
     """Unregister a volunteer from an event and log dataspace cancellation."""
-    v = get_object_or_404(Volunteer, pk=vid)
-    event = get_object_or_404(VolunteerEvent, pk=eid)
+    v, event = _participation_pair(vid, eid)
 
     if request.method == "POST":
         v.events.remove(event)
@@ -358,8 +389,12 @@ def unregister_event(request, vid, eid):
     return redirect("vms:dashboard", vid=vid)
 
 def api_orgs(request):
-    orgs = list(Organization.objects.values("id", "name"))
-    return JsonResponse({"organizations": orgs})
+    # Encoded body is cached until an Organization is saved or deleted (see models signals)
+    body = cache.get(ORGS_JSON_CACHE_KEY)
+    if body is None:
+        body = dumps({"organizations": list(Organization.objects.values("id", "name"))})
+        cache.set(ORGS_JSON_CACHE_KEY, body, ORGS_JSON_TTL)
+    return HttpResponse(body, content_type="application/json")
 
 
 def toggle_role(request, volunteer_id):
@@ -394,24 +429,31 @@ MILESTONE_HOURS = 100
 def _minimal_subset_to_reach(target, events):
     """
     Greedy: pick largest durations first until >= target.
-    events: list of dicts with 'id', 'hours', ...
+    events: list of dicts with 'id', 'hours' (int), ...
     returns: set of event ids selected
     """
-    ordered = sorted(events, key=lambda e: int(e["hours"]), reverse=True)
-    out, total = [], 0
-    for e in ordered:
+    out, total = set(), 0
+    for e in sorted(events, key=itemgetter("hours"), reverse=True):
         if total >= target: break
-        out.append(e["id"])
-        total += int(e["hours"])
-    return set(out), total
+        out.add(e["id"])
+        total += e["hours"]
+    return out, total
 
 
 def api_certificate_context(request, vid):
-    v = get_object_or_404(Volunteer, pk=vid)
+    v = get_object_or_404(
+        Volunteer.objects.select_related("organization").only("id", "organization__name"), pk=vid
+    )
     home_org = v.organization.name if v.organization else None
 
-    # completed activities = all registered events marked finished
-    completed = v.events.filter(isFinished=True).select_related("organization").prefetch_related("skills")
+    # completed activities = all registered events marked finished (plain rows, no model instances)
+    completed = list(v.events.filter(isFinished=True).values("id", "name", "duration_hours", "organization__name"))
+    skill_labels = defaultdict(list)
+    for event_id, label in VolunteerEvent.skills.through.objects.filter(
+        volunteerevent_id__in=[e["id"] for e in completed]
+    ).values_list("volunteerevent_id", "skill__label"):
+        skill_labels[event_id].append(label)
+
     activities = []
     hours_total = 0
     hours_home = 0
@@ -419,18 +461,19 @@ def api_certificate_context(request, vid):
 
     # build list
     for e in completed:
-        hrs = int(e.duration_hours)
+        hrs = int(e["duration_hours"])
+        provider = e["organization__name"]
         hours_total += hrs
-        if home_org and e.organization and e.organization.name == home_org:
+        if home_org and provider == home_org:
             hours_home += hrs
         else:
             hours_remote += hrs
         activities.append({
-            "id": str(e.id),
-            "title": e.name,
+            "id": str(e["id"]),
+            "title": e["name"],
             "hours": hrs,
-            "provider": e.organization.name if e.organization else "Unknown",
-            "skills": [s.label for s in e.skills.all()],
+            "provider": provider or "Unknown",
+            "skills": skill_labels[e["id"]],
         })
 
     # choose a minimal subset that reaches 100h (if possible)
@@ -445,7 +488,7 @@ def api_certificate_context(request, vid):
         "contrib_sum": contrib_sum,
         "activities": activities
     }
-    return JsonResponse(data)
+    return ORJSONResponse(data)
 
 @csrf_exempt
 
@@ -455,7 +498,7 @@ def api_certificate_request(request):
     Follows a data-space pattern: request → contract → cross-org attestations → issuance.
     """
     try:
-        payload = json.loads(request.body)
+        payload = orjson.loads(request.body)
     except Exception:
         return HttpResponseBadRequest("Invalid JSON")
 
@@ -469,8 +512,10 @@ def api_certificate_request(request):
 
     # Load selected events (proof set)
     event_ids = [int(i["id"]) for i in items]
-    ev_qs = VolunteerEvent.objects.filter(id__in=event_ids).select_related("organization").prefetch_related("skills")
-    if ev_qs.count() != len(event_ids):
+    ev_list = list(
+        VolunteerEvent.objects.filter(id__in=event_ids).select_related("organization").prefetch_related("skills")
+    )
+    if {e.id for e in ev_list} != set(event_ids):
         return HttpResponseBadRequest("Some selected activities not found")
 
     # recompute hours and breakdown
@@ -481,55 +526,63 @@ def api_certificate_request(request):
     first_aid_hours = 0
 
     cert_items = []
-    for e in ev_qs:
+    providers = set()  # distinct providers other than home, for the attestation logs
+    for e in ev_list:
         hrs = int(e.duration_hours)
         total += hrs
-        if home_org and e.organization and e.organization.name == home_org:
+        provider = e.organization.name if e.organization else "Unknown"
+        if home_org and provider == home_org:
             from_home += hrs
         else:
             from_remote += hrs
+            providers.add(provider)
 
-        # hours towards First Aid recognition
-        if first_aid_skill and e.skills.filter(id=first_aid_skill.id).exists():
+        # hours towards First Aid recognition (skills are prefetched; no query per event)
+        skills = e.skills.all()
+        if first_aid_skill and any(sk.id == first_aid_skill.id for sk in skills):
             first_aid_hours += hrs
 
         cert_items.append({
             "event_id": e.id,
             "event_name": e.name,
             "hours": hrs,
-            "provider": e.organization.name if e.organization else "Unknown",
-            "skills": [s.label for s in e.skills.all()],
+            "provider": provider,
+            "skills": [sk.label for sk in skills],
         })
 
     # must meet milestone
     if total < MILESTONE_HOURS:
-        return JsonResponse({"status": "rejected", "reason": f"Need {MILESTONE_HOURS}h; provided {total}h"}, status=400)
+        return ORJSONResponse({"status": "rejected", "reason": f"Need {MILESTONE_HOURS}h; provided {total}h"}, status=400)
 
     # -------- Data space logs (story style) ----------
     # Request
     log_event("EDC.CredentialRequest", f"{v.name} (via {home_org}) requests volunteer certificate based on {len(cert_items)} activities")
 
     # Contract for credential issuance
-    contract_id = hashlib.sha1(f"credential-{vid}-{total}".encode()).hexdigest()[:12]
-    log_event("EDC.ContractNegotiated", json.dumps({
+    contract_id = hashlib.blake2b(f"credential-{vid}-{total}".encode(), digest_size=6).hexdigest()
+    log_event("EDC.ContractNegotiated", LazyJSON({
         "between": [home_org or "Unknown", "CredentialIssuer"],
         "contract_id": contract_id,
         "purpose": "credential_issuance",
         "data_minimization": "Only activity IDs, hours and provider attestations shared",
         "retention": "P36M or until revoked"
-    }, indent=2))
+    }))
 
-    # Cross-org attestations (simulate one per distinct provider other than home)
-    providers = sorted({ci["provider"] for ci in cert_items if ci["provider"]})
-    for p in providers:
-        if home_org and p == home_org:  # home org doesn't need external attestation
-            continue
+    # Cross-org attestations (simulate one per distinct provider other than home,
+    # collected while summing the hours; home org doesn't need external attestation)
+    for p in sorted(providers):
         log_event("EDC.AttestationRequested", f"Requesting hours attestation from {p} for {v.name}")
         log_event("EDC.AttestationReceived", f"{p} confirms contributed hours for {v.name} under contract {contract_id}")
 
     # -------- Persist certificate ----------
-    issuer = Organization.objects.filter(is_dsga=True).first() or v.organization  # mock: DSGA or home org
-    proof = hashlib.sha1(json.dumps(cert_items, sort_keys=True).encode()).hexdigest()
+    # mock: DSGA or home org; the DSGA is effectively a singleton, so it is cached
+    issuer = cache.get_or_set(
+        DSGA_ISSUER_CACHE_KEY,
+        lambda: Organization.objects.filter(is_dsga=True).only("id", "name").first(),
+        DSGA_ISSUER_TTL,
+    ) or v.organization
+    # SHA-256 over compact, key-sorted JSON of the items
+    proof = hashlib.sha256(dumps(cert_items, orjson.OPT_SORT_KEYS)).hexdigest()
 
     cert = Certificate.objects.create(
         volunteer=v,
@@ -563,7 +616,9 @@ def api_certificate_request(request):
     log_event("Credential.Issued", f"Issued Volunteer Certificate {cert.id} to {v.name} by {issuer.name if issuer else 'Unknown'}")
     log_event("EDC.CredentialDelivered", f"Certificate {cert.id} delivered to {home_org} (holder)")
 
-    return JsonResponse({
+    # splice the items in pre-serialized
+    cert_jsonld["vms:items"] = cert.items_fragment()
+    return ORJSONResponse({
         "status": "issued",
         "certificate": cert_jsonld,
         "contract_id": contract_id
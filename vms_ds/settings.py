@@ -132,3 +132,12 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# Minimum level of LogEntry rows recorded by vms.services.logging (DEBUG = everything)
+VMS_LOG_LEVEL = os.environ.get("VMS_LOG_LEVEL", "DEBUG")
+
+# Opt-in: "1" writes LogEntry rows from a background thread in batches (vms.services.log_queue).
+# The default writes inline: log_event returns saved rows and transaction.atomic() covers them.
+# Queued entries are lost if the process is killed before they are flushed.
+VMS_LOG_ASYNC = os.environ.get("VMS_LOG_ASYNC", "0") == "1"